@@ -1,38 +1,147 @@
 from flask import Flask
-from models import db 
-from flask_migrate import Migrate
+from flask.json.provider import JSONProvider
+from models import db
 from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+import orjson
 import os
 
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///app.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-migrate = Migrate(app, db)
-db.init_app(app)
-
 load_dotenv()
 # print("API KEY LOADED:", os.getenv("OPENAI_API_KEY"))
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-#Register Blueprints
-from views import *
+migrate = None  # set up in create_app only when migrations are enabled
+
+
+def _sqlite_pragmas(dbapi_conn, _connection_record):
+    """Tune SQLite on every new connection.
+
+    WAL lets readers run while a writer commits, and synchronous=NORMAL
+    drops the per-commit fsync (safe under WAL). The rest keeps temp
+    data and hot pages in memory instead of on disk.
+    """
+    cur = dbapi_conn.cursor()
+    # SQLite ships with FK enforcement off; the models rely on
+    # ON DELETE CASCADE so the bulk deletes fan out in the database.
+    # Left off for `flask db` runs — Alembic's batch mode rebuilds
+    # tables with DROP + RENAME, which enforcement would reject.
+    if not os.getenv("FLASK_RUN_MIGRATIONS"):
+        cur.execute("PRAGMA foreign_keys=ON")
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.execute("PRAGMA mmap_size=268435456")
+    cur.execute("PRAGMA cache_size=-64000")
+    cur.close()
+
+
+class OrjsonProvider(JSONProvider):
+    """orjson-backed JSON provider for jsonify.
+
+    orjson's C encoder is several times faster than the stdlib on the
+    dict-heavy list responses here, and it serializes datetime natively
+    (RFC 3339), so serializers can pass raw datetime objects. The
+    decoder feeds request.get_json(), so inbound bodies get the same
+    SIMD-accelerated parse.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+def create_app():
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///app.db'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Werkzeug rejects oversize bodies at parse time (413) before any
+    # handler buffers them; routes apply their own tighter limits
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+    # Behind nginx/Apache, let the proxy splice files to the client with
+    # sendfile(2) (X-Sendfile / X-Accel-Redirect) instead of Python
+    # reading and yielding the bytes. Opt-in: requires an `internal;`
+    # location for the upload folders on the proxy side.
+    app.config['USE_X_SENDFILE'] = os.getenv("USE_X_SENDFILE", "").lower() in ("1", "true", "yes")
+    # Optional CDN/static origin (e.g. https://cdn.example.com/static).
+    # When set, profile-picture URLs are built with an f-string instead
+    # of url_for's URL-adapter machinery on every response.
+    app.config['STATIC_BASE_URL'] = os.getenv("STATIC_BASE_URL")
+    # Absolute static dir, joined once here instead of per request in
+    # the views that build file paths
+    app.config['STATIC_ROOT'] = os.path.join(app.root_path, "static")
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        # Keep a pool of long-lived connections instead of reopening the
+        # DB file (and its -wal/-shm companions) on every checkout.
+        # Sized for bursty concurrency: 20 steady + 30 overflow under
+        # load, recycled every 30 min.
+        "poolclass": QueuePool,
+        "pool_size": 20,
+        "max_overflow": 30,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        # Flask's threaded dev server shares connections across threads
+        "connect_args": {"check_same_thread": False},
+    }
+
+    # Flask-Migrate drags in Alembic + Mako and is only needed for the
+    # `flask db` CLI — skip it at normal runtime
+    # (usage: FLASK_RUN_MIGRATIONS=1 flask db upgrade)
+    if os.getenv("FLASK_RUN_MIGRATIONS"):
+        from flask_migrate import Migrate
+        global migrate
+        migrate = Migrate(app, db)
+
+    db.init_app(app)
+
+    # Engine is created lazily, so grab it inside an app context
+    with app.app_context():
+        event.listen(db.engine, "connect", _sqlite_pragmas)
+
+    # Register Blueprints — imported here (not at module top) so that
+    # importing app.py doesn't pay for every view module up front
+    from views.user import user_bp
+    from views.course import course_bp
+    from views.unit import unit_bp
+    from views.note import note_bp
+    from views.flashcard import flashcard_bp
+    from views.assignment import assignment_bp
+    from views.submission import submission_bp
+    from views.grade import grade_bp
+    from views.question import question_bp
+    from views.answer import answer_bp
+    from views.vote import vote_bp
+
+    app.register_blueprint(user_bp)
+    app.register_blueprint(course_bp)
+    app.register_blueprint(unit_bp)
+    app.register_blueprint(note_bp)
+    app.register_blueprint(flashcard_bp)
+    app.register_blueprint(assignment_bp)
+    app.register_blueprint(submission_bp)
+    app.register_blueprint(grade_bp)
+    app.register_blueprint(question_bp)
+    app.register_blueprint(answer_bp)
+    app.register_blueprint(vote_bp)
+
+    @app.teardown_request
+    def _commit_session(exc):
+        # One commit per request: anything flushed-but-uncommitted (e.g.
+        # via BaseModel.save) lands here in a single transaction
+        if exc:
+            db.session.rollback()
+        else:
+            db.session.commit()
 
-app.register_blueprint(user_bp)
-app.register_blueprint(course_bp)
-app.register_blueprint(unit_bp)
-app.register_blueprint(note_bp)
-app.register_blueprint(flashcard_bp)
-app.register_blueprint(assignment_bp)
-app.register_blueprint(submission_bp)
-app.register_blueprint(grade_bp)
-app.register_blueprint(question_bp)
-app.register_blueprint(answer_bp)
-app.register_blueprint(vote_bp)
+    return app
 
 
+app = create_app()
 
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
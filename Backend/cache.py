@@ -0,0 +1,50 @@
+import threading
+import time
+
+# =========================================================
+# In-process TTL cache
+# =========================================================
+# Stands in for Redis in this single-process deployment: same
+# get / set-with-expiry semantics without running another service.
+# Values are stored as-is (no serialization round-trip needed since
+# there's no network hop).
+
+
+class TTLCache:
+    """Thread-safe dict with per-entry expiry and LRU-ish eviction."""
+
+    def __init__(self, maxsize=1024):
+        self._data = {}  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._maxsize = maxsize
+
+    def get(self, key):
+        """Return the cached value, or None if missing/expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            # re-insert so dict order tracks recency for eviction
+            del self._data[key]
+            self._data[key] = entry
+            return value
+
+    def set(self, key, value, ttl=3600):
+        with self._lock:
+            self._data.pop(key, None)
+            if len(self._data) >= self._maxsize:
+                # evict the least recently touched entry
+                self._data.pop(next(iter(self._data)))
+            self._data[key] = (time.monotonic() + ttl, value)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+# Shared instance — import this rather than constructing per-module caches
+cache = TTLCache()
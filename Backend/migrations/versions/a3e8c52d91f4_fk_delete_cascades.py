@@ -0,0 +1,94 @@
+"""fk delete cascades
+
+Revision ID: a3e8c52d91f4
+Revises: f1c6a84d27e9
+Create Date: 2026-08-30 18:23:12.904417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e8c52d91f4'
+down_revision = 'f1c6a84d27e9'
+branch_labels = None
+depends_on = None
+
+
+# SQLite can't alter FK actions in place, so every table with FKs gets
+# a batch rebuild whose constraints carry the ON DELETE actions the
+# models now declare. Reflection supplies the full table definition;
+# only the delete action is overridden.
+_TABLES = [
+    'units', 'notes', 'flashcards', 'questions', 'votes', 'answers',
+    'assignments', 'submissions', 'grades', 'notifications',
+    'activity_logs',
+]
+
+# (table, fk column) -> action; everything not listed cascades
+_FK_OVERRIDES = {
+    ('notes', 'uploaded_by'): 'SET NULL',
+}
+
+# Same rules as the d91b30c4e8f1 (parent touch triggers) migration —
+# the rebuilds would otherwise break mid-rename and shed the triggers
+_TOUCH_RULES = [
+    ('notes', 'units', 'unit_id'),
+    ('assignments', 'units', 'unit_id'),
+    ('submissions', 'assignments', 'assignment_id'),
+]
+
+
+def _drop_touch_triggers():
+    for child, parent, _fk in _TOUCH_RULES:
+        for action in ('insert', 'update', 'delete'):
+            op.execute(f"DROP TRIGGER IF EXISTS trg_{child}_{action}_touch_{parent}")
+
+
+def _create_touch_triggers():
+    for child, parent, fk in _TOUCH_RULES:
+        for action, ref in (('insert', 'NEW'), ('update', 'NEW'), ('delete', 'OLD')):
+            op.execute(f"""
+                CREATE TRIGGER trg_{child}_{action}_touch_{parent}
+                AFTER {action.upper()} ON {child}
+                BEGIN
+                    UPDATE {parent} SET updated_at = CURRENT_TIMESTAMP
+                    WHERE id = {ref}.{fk};
+                END
+            """)
+
+
+def _rebuild_with_actions(delete_action):
+    """Rebuild each FK-bearing table with the given delete behavior.
+
+    delete_action(table, column) returns the ON DELETE action to apply
+    (None for the plain pre-cascade constraints on downgrade).
+    """
+    bind = op.get_bind()
+    _drop_touch_triggers()
+    for name in _TABLES:
+        table = sa.Table(name, sa.MetaData(), autoload_with=bind)
+        for constraint in table.foreign_key_constraints:
+            column = list(constraint.columns)[0].name
+            constraint.ondelete = delete_action(name, column)
+        with op.batch_alter_table(name, copy_from=table, recreate='always'):
+            pass
+    # SQLite reflection skips partial indexes, so the batch copy of
+    # assignments loses the active-title uniqueness rule — restore it
+    # (IF NOT EXISTS in case reflection did carry it over)
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_assignments_title_unit_active "
+        "ON assignments (title, unit_id) WHERE is_active = 1"
+    )
+    _create_touch_triggers()
+
+
+def upgrade():
+    _rebuild_with_actions(
+        lambda table, column: _FK_OVERRIDES.get((table, column), 'CASCADE')
+    )
+
+
+def downgrade():
+    _rebuild_with_actions(lambda table, column: None)
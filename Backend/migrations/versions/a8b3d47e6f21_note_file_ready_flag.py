@@ -0,0 +1,33 @@
+"""note file ready flag
+
+Revision ID: a8b3d47e6f21
+Revises: f7c2a91b44d6
+Create Date: 2026-08-30 13:38:02.441856
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8b3d47e6f21'
+down_revision = 'f7c2a91b44d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('notes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column(
+            'file_ready', sa.Boolean(),
+            server_default=sa.text('0'), nullable=False,
+        ))
+
+    # Notes that already have a path were written synchronously before
+    # this flag existed — mark them ready
+    op.execute("UPDATE notes SET file_ready = 1 WHERE file_path IS NOT NULL")
+
+
+def downgrade():
+    with op.batch_alter_table('notes', schema=None) as batch_op:
+        batch_op.drop_column('file_ready')
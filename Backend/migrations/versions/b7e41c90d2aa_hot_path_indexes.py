@@ -0,0 +1,70 @@
+"""hot path indexes
+
+Revision ID: b7e41c90d2aa
+Revises: 6abf10c821a7
+Create Date: 2026-08-30 09:12:41.338127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e41c90d2aa'
+down_revision = '6abf10c821a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('answers', schema=None) as batch_op:
+        batch_op.create_index('ix_answers_qid_created', ['question_id', 'created_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_answers_author_id'), ['author_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_answers_question_id'), ['question_id'], unique=False)
+
+    with op.batch_alter_table('assignments', schema=None) as batch_op:
+        batch_op.create_index('ix_assignments_title_unit_active', ['title', 'unit_id', 'is_active'], unique=False)
+        batch_op.create_index('ix_assignments_unit_active', ['unit_id', 'is_active'], unique=False)
+        batch_op.create_index(batch_op.f('ix_assignments_unit_id'), ['unit_id'], unique=False)
+
+    with op.batch_alter_table('notes', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_notes_unit_id'), ['unit_id'], unique=False)
+
+    with op.batch_alter_table('submissions', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_submissions_assignment_id'), ['assignment_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_submissions_student_id'), ['student_id'], unique=False)
+
+    with op.batch_alter_table('units', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_units_course_id'), ['course_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_units_instructor_id'), ['instructor_id'], unique=False)
+
+    with op.batch_alter_table('votes', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_votes_answer_id'), ['answer_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_votes_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('votes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_votes_user_id'))
+        batch_op.drop_index(batch_op.f('ix_votes_answer_id'))
+
+    with op.batch_alter_table('units', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_units_instructor_id'))
+        batch_op.drop_index(batch_op.f('ix_units_course_id'))
+
+    with op.batch_alter_table('submissions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_submissions_student_id'))
+        batch_op.drop_index(batch_op.f('ix_submissions_assignment_id'))
+
+    with op.batch_alter_table('notes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_notes_unit_id'))
+
+    with op.batch_alter_table('assignments', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_assignments_unit_id'))
+        batch_op.drop_index('ix_assignments_unit_active')
+        batch_op.drop_index('ix_assignments_title_unit_active')
+
+    with op.batch_alter_table('answers', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_answers_question_id'))
+        batch_op.drop_index(batch_op.f('ix_answers_author_id'))
+        batch_op.drop_index('ix_answers_qid_created')
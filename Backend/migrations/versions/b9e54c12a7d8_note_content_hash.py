@@ -0,0 +1,30 @@
+"""note content hash
+
+Revision ID: b9e54c12a7d8
+Revises: a8b3d47e6f21
+Create Date: 2026-08-30 14:02:37.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9e54c12a7d8'
+down_revision = 'a8b3d47e6f21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows keep NULL (multiple NULLs are allowed under the
+    # unique constraint); hashes fill in as notes are created/edited
+    with op.batch_alter_table('notes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_sha256', sa.String(length=64), nullable=True))
+        batch_op.create_unique_constraint('uq_notes_unit_content_sha', ['unit_id', 'content_sha256'])
+
+
+def downgrade():
+    with op.batch_alter_table('notes', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_notes_unit_content_sha', type_='unique')
+        batch_op.drop_column('content_sha256')
@@ -0,0 +1,33 @@
+"""unique active assignment title
+
+Revision ID: c3f8a12e57bd
+Revises: b7e41c90d2aa
+Create Date: 2026-08-30 10:05:22.914708
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f8a12e57bd'
+down_revision = 'b7e41c90d2aa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('assignments', schema=None) as batch_op:
+        batch_op.drop_index('ix_assignments_title_unit_active')
+        batch_op.create_index(
+            'uq_assignments_title_unit_active',
+            ['title', 'unit_id'],
+            unique=True,
+            sqlite_where=sa.text('is_active = 1'),
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('assignments', schema=None) as batch_op:
+        batch_op.drop_index('uq_assignments_title_unit_active')
+        batch_op.create_index('ix_assignments_title_unit_active', ['title', 'unit_id', 'is_active'], unique=False)
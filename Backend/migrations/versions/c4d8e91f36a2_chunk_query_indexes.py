@@ -0,0 +1,46 @@
+"""flashcard grade submission question indexes
+
+Revision ID: c4d8e91f36a2
+Revises: b9e54c12a7d8
+Create Date: 2026-08-30 14:31:48.827615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d8e91f36a2'
+down_revision = 'b9e54c12a7d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('flashcards', schema=None) as batch_op:
+        batch_op.create_index('ix_flashcards_note_question', ['note_id', 'question'], unique=False)
+
+    with op.batch_alter_table('grades', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_grades_submission', ['submission_id'])
+        batch_op.create_index('ix_grades_instructor', ['instructor_id'], unique=False)
+
+    with op.batch_alter_table('submissions', schema=None) as batch_op:
+        batch_op.create_index('ix_submissions_student_assignment', ['student_id', 'assignment_id'], unique=False)
+
+    with op.batch_alter_table('questions', schema=None) as batch_op:
+        batch_op.create_index('ix_questions_author_title', ['author_id', 'title'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('questions', schema=None) as batch_op:
+        batch_op.drop_index('ix_questions_author_title')
+
+    with op.batch_alter_table('submissions', schema=None) as batch_op:
+        batch_op.drop_index('ix_submissions_student_assignment')
+
+    with op.batch_alter_table('grades', schema=None) as batch_op:
+        batch_op.drop_index('ix_grades_instructor')
+        batch_op.drop_constraint('uq_grades_submission', type_='unique')
+
+    with op.batch_alter_table('flashcards', schema=None) as batch_op:
+        batch_op.drop_index('ix_flashcards_note_question')
@@ -0,0 +1,32 @@
+"""unique vote per user answer
+
+Revision ID: d2f6b83a95c4
+Revises: c4d8e91f36a2
+Create Date: 2026-08-30 15:14:26.670981
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f6b83a95c4'
+down_revision = 'c4d8e91f36a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Collapse any pre-existing duplicates (keep the newest vote) so the
+    # constraint can be created
+    op.execute(
+        "DELETE FROM votes WHERE id NOT IN ("
+        "SELECT MAX(id) FROM votes GROUP BY user_id, answer_id)"
+    )
+    with op.batch_alter_table('votes', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_votes_user_answer', ['user_id', 'answer_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('votes', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_votes_user_answer', type_='unique')
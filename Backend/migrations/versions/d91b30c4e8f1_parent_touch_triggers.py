@@ -0,0 +1,44 @@
+"""parent touch triggers
+
+Revision ID: d91b30c4e8f1
+Revises: c3f8a12e57bd
+Create Date: 2026-08-30 10:47:18.502396
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd91b30c4e8f1'
+down_revision = 'c3f8a12e57bd'
+branch_labels = None
+depends_on = None
+
+
+# (child table, parent table, FK column) pairs whose writes should bump
+# the parent's updated_at — mirrors the old Python touch() listener
+_TOUCH_RULES = [
+    ('notes', 'units', 'unit_id'),
+    ('assignments', 'units', 'unit_id'),
+    ('submissions', 'assignments', 'assignment_id'),
+]
+
+
+def upgrade():
+    for child, parent, fk in _TOUCH_RULES:
+        for action, ref in (('insert', 'NEW'), ('update', 'NEW'), ('delete', 'OLD')):
+            op.execute(f"""
+                CREATE TRIGGER trg_{child}_{action}_touch_{parent}
+                AFTER {action.upper()} ON {child}
+                BEGIN
+                    UPDATE {parent} SET updated_at = CURRENT_TIMESTAMP
+                    WHERE id = {ref}.{fk};
+                END
+            """)
+
+
+def downgrade():
+    for child, parent, _fk in _TOUCH_RULES:
+        for action in ('insert', 'update', 'delete'):
+            op.execute(f"DROP TRIGGER IF EXISTS trg_{child}_{action}_touch_{parent}")
@@ -0,0 +1,92 @@
+"""server side timestamps
+
+Revision ID: e5a2747f19c3
+Revises: d91b30c4e8f1
+Create Date: 2026-08-30 11:20:54.176289
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a2747f19c3'
+down_revision = 'd91b30c4e8f1'
+branch_labels = None
+depends_on = None
+
+
+# Every table that mixes in BaseModel (votes has no timestamps)
+_TABLES = [
+    'users', 'courses', 'units', 'notes', 'flashcards', 'questions',
+    'answers', 'assignments', 'submissions', 'grades', 'notifications',
+    'activity_logs',
+]
+
+# Same rules as the d91b30c4e8f1 (parent touch triggers) migration.
+# The batch rebuilds below drop and recreate several of these tables;
+# SQLite refuses the rename step while a trigger still references the
+# old table, and a rebuilt child table would silently lose its
+# triggers — so drop them all first and recreate them at the end.
+_TOUCH_RULES = [
+    ('notes', 'units', 'unit_id'),
+    ('assignments', 'units', 'unit_id'),
+    ('submissions', 'assignments', 'assignment_id'),
+]
+
+
+def _drop_touch_triggers():
+    for child, parent, _fk in _TOUCH_RULES:
+        for action in ('insert', 'update', 'delete'):
+            op.execute(f"DROP TRIGGER IF EXISTS trg_{child}_{action}_touch_{parent}")
+
+
+def _create_touch_triggers():
+    for child, parent, fk in _TOUCH_RULES:
+        for action, ref in (('insert', 'NEW'), ('update', 'NEW'), ('delete', 'OLD')):
+            op.execute(f"""
+                CREATE TRIGGER trg_{child}_{action}_touch_{parent}
+                AFTER {action.upper()} ON {child}
+                BEGIN
+                    UPDATE {parent} SET updated_at = CURRENT_TIMESTAMP
+                    WHERE id = {ref}.{fk};
+                END
+            """)
+
+
+def upgrade():
+    _drop_touch_triggers()
+    for table in _TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(
+                'created_at',
+                existing_type=sa.DateTime(),
+                server_default=sa.text('(CURRENT_TIMESTAMP)'),
+                existing_nullable=False,
+            )
+            batch_op.alter_column(
+                'updated_at',
+                existing_type=sa.DateTime(),
+                server_default=sa.text('(CURRENT_TIMESTAMP)'),
+                existing_nullable=True,
+            )
+    _create_touch_triggers()
+
+
+def downgrade():
+    _drop_touch_triggers()
+    for table in _TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(
+                'updated_at',
+                existing_type=sa.DateTime(),
+                server_default=None,
+                existing_nullable=True,
+            )
+            batch_op.alter_column(
+                'created_at',
+                existing_type=sa.DateTime(),
+                server_default=None,
+                existing_nullable=False,
+            )
+    _create_touch_triggers()
@@ -0,0 +1,26 @@
+"""unit course title index
+
+Revision ID: e7b1f92c48a5
+Revises: d2f6b83a95c4
+Create Date: 2026-08-30 16:02:41.118532
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b1f92c48a5'
+down_revision = 'd2f6b83a95c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('units', schema=None) as batch_op:
+        batch_op.create_index('ix_units_course_title', ['course_id', 'title'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('units', schema=None) as batch_op:
+        batch_op.drop_index('ix_units_course_title')
@@ -0,0 +1,26 @@
+"""vote answer type index
+
+Revision ID: f1c6a84d27e9
+Revises: e7b1f92c48a5
+Create Date: 2026-08-30 16:41:08.554216
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c6a84d27e9'
+down_revision = 'e7b1f92c48a5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('votes', schema=None) as batch_op:
+        batch_op.create_index('ix_vote_answer_type', ['answer_id', 'vote_type'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('votes', schema=None) as batch_op:
+        batch_op.drop_index('ix_vote_answer_type')
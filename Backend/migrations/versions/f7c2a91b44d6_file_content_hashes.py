@@ -0,0 +1,36 @@
+"""file content hashes
+
+Revision ID: f7c2a91b44d6
+Revises: e5a2747f19c3
+Create Date: 2026-08-30 13:05:11.902734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7c2a91b44d6'
+down_revision = 'e5a2747f19c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('notes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('file_sha256', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_notes_file_sha256'), ['file_sha256'], unique=False)
+
+    with op.batch_alter_table('submissions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('file_sha256', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_submissions_file_sha256'), ['file_sha256'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('submissions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_submissions_file_sha256'))
+        batch_op.drop_column('file_sha256')
+
+    with op.batch_alter_table('notes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_notes_file_sha256'))
+        batch_op.drop_column('file_sha256')
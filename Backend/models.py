@@ -1,6 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
-from sqlalchemy import MetaData, event
+from sqlalchemy import MetaData, func
+from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy.orm import validates
 
 # For Alembic migration compatibility
@@ -13,16 +13,20 @@ db = SQLAlchemy(metadata=metadata)
 class BaseModel:
     """Reusable fields for all models."""
     id = db.Column(db.Integer, primary_key=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Timestamps are filled by the database (transaction clock), not by
+    # Python-side datetime.utcnow() calls in every constructor
+    created_at = db.Column(db.DateTime, server_default=func.now(), nullable=False)
+    updated_at = db.Column(db.DateTime, server_default=func.now(), onupdate=func.now())
 
     def save(self):
+        # Flush (assigns PKs) but leave the commit to the per-request
+        # teardown in app.py so many saves share one fsync
         db.session.add(self)
-        db.session.commit()
+        db.session.flush()
 
     def delete(self):
         db.session.delete(self)
-        db.session.commit()
+        db.session.flush()
 
     def __repr__(self):
         return f"<{self.__class__.__name__} id={self.id}>"
@@ -42,15 +46,28 @@ class User(db.Model, BaseModel):
     profile_picture = db.Column(db.String(255))
     is_active = db.Column(db.Boolean, default=True, nullable=False)
 
-    # Relationships
-    units = db.relationship("Unit", back_populates="instructor", cascade="all, delete-orphan")
-    questions = db.relationship("Question", back_populates="author", cascade="all, delete-orphan")
-    answers = db.relationship("Answer", back_populates="author", cascade="all, delete-orphan")
-    submissions = db.relationship("Submission", back_populates="student", cascade="all, delete-orphan")
-    given_grades = db.relationship("Grade", back_populates="instructor", foreign_keys="Grade.instructor_id")
-    notifications = db.relationship("Notification", back_populates="user", cascade="all, delete-orphan")
-    activity_logs = db.relationship("ActivityLog", back_populates="user", cascade="all, delete-orphan")
-    votes = db.relationship("Vote", back_populates="user", cascade="all, delete-orphan")
+    # Relationships — passive_deletes leaves cascading to the database
+    # (ON DELETE CASCADE on the FKs), so deleting a user is one DELETE
+    # statement instead of the ORM loading every dependent collection
+    units = db.relationship("Unit", back_populates="instructor", cascade="all, delete-orphan", passive_deletes=True)
+    questions = db.relationship("Question", back_populates="author", cascade="all, delete-orphan", passive_deletes=True)
+    answers = db.relationship("Answer", back_populates="author", cascade="all, delete-orphan", passive_deletes=True)
+    submissions = db.relationship("Submission", back_populates="student", cascade="all, delete-orphan", passive_deletes=True)
+    given_grades = db.relationship("Grade", back_populates="instructor", foreign_keys="Grade.instructor_id", passive_deletes=True)
+    notifications = db.relationship("Notification", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    activity_logs = db.relationship("ActivityLog", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    votes = db.relationship("Vote", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+
+    def set_password(self, password):
+        # scrypt: memory-hard KDF run by OpenSSL's optimized C code —
+        # markedly faster per verify than werkzeug's default 600k-round
+        # pbkdf2 at comparable attack cost
+        self.password = generate_password_hash(password, method="scrypt")
+
+    def verify_password(self, password):
+        # check_password_hash dispatches on the stored prefix, so
+        # pre-existing pbkdf2 hashes keep verifying
+        return check_password_hash(self.password, password)
 
 
 # =========================================================
@@ -65,7 +82,7 @@ class Course(db.Model, BaseModel):
     is_active = db.Column(db.Boolean, default=True, nullable=False)
 
     # Relationships
-    units = db.relationship("Unit", back_populates="course", cascade="all, delete-orphan")
+    units = db.relationship("Unit", back_populates="course", cascade="all, delete-orphan", passive_deletes=True)
 
     def __repr__(self):
         return f"<Course {self.title} active={self.is_active}>"
@@ -73,18 +90,22 @@ class Course(db.Model, BaseModel):
 
 class Unit(db.Model, BaseModel):
     __tablename__ = "units"
+    __table_args__ = (
+        # Covers the duplicate-title-per-course checks in the unit views
+        db.Index("ix_units_course_title", "course_id", "title"),
+    )
 
     title = db.Column(db.String(120), nullable=False)
     overview = db.Column(db.Text)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
-    course_id = db.Column(db.Integer, db.ForeignKey("courses.id"), nullable=False)
-    instructor_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False) 
+    course_id = db.Column(db.Integer, db.ForeignKey("courses.id", ondelete="CASCADE"), nullable=False, index=True)
+    instructor_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
 
     # Relationships
     course = db.relationship("Course", back_populates="units")
     instructor = db.relationship("User", back_populates="units")
-    notes = db.relationship("Note", back_populates="unit", cascade="all, delete-orphan")
-    assignments = db.relationship("Assignment", back_populates="unit", cascade="all, delete-orphan")
+    notes = db.relationship("Note", back_populates="unit", cascade="all, delete-orphan", passive_deletes=True)
+    assignments = db.relationship("Assignment", back_populates="unit", cascade="all, delete-orphan", passive_deletes=True)
 
     def __repr__(self):
         return f"<Unit {self.title} active={self.is_active}>"
@@ -92,16 +113,30 @@ class Unit(db.Model, BaseModel):
 
 class Note(db.Model, BaseModel):
     __tablename__ = "notes"
+    __table_args__ = (
+        # Duplicate text detection compares fixed-size hashes via this
+        # index instead of whole TEXT columns; also the atomic backstop
+        # for concurrent inserts of the same content
+        db.UniqueConstraint("unit_id", "content_sha256", name="uq_notes_unit_content_sha"),
+    )
 
     content = db.Column(db.Text)
+    # SHA-256 of content — NULL for file-only notes
+    content_sha256 = db.Column(db.String(64))
     file_path = db.Column(db.String(255))
+    # SHA-256 of the uploaded PDF — content-based dedupe instead of
+    # comparing filenames
+    file_sha256 = db.Column(db.String(64), index=True)
+    # Flipped by the background upload worker once the PDF is on disk —
+    # saves an os.path.exists syscall per row when serializing lists
+    file_ready = db.Column(db.Boolean, default=False, nullable=False)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
-    unit_id = db.Column(db.Integer, db.ForeignKey("units.id"), nullable=False)
-    uploaded_by = db.Column(db.Integer, db.ForeignKey("users.id"))
+    unit_id = db.Column(db.Integer, db.ForeignKey("units.id", ondelete="CASCADE"), nullable=False, index=True)
+    uploaded_by = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="SET NULL"))
 
     unit = db.relationship("Unit", back_populates="notes")
     uploader = db.relationship("User")
-    flashcards = db.relationship("Flashcard", back_populates="note", cascade="all, delete-orphan")
+    flashcards = db.relationship("Flashcard", back_populates="note", cascade="all, delete-orphan", passive_deletes=True)
 
     def __repr__(self):
         return f"<Note id={self.id} unit_id={self.unit_id} active={self.is_active}>"
@@ -109,11 +144,15 @@ class Note(db.Model, BaseModel):
 
 class Flashcard(db.Model, BaseModel):
     __tablename__ = "flashcards"
+    __table_args__ = (
+        # Covers the duplicate-question probe and per-note listing
+        db.Index("ix_flashcards_note_question", "note_id", "question"),
+    )
 
     question = db.Column(db.String(255), nullable=False)
     answer = db.Column(db.String(255), nullable=False)
     options = db.Column(db.JSON) 
-    note_id = db.Column(db.Integer, db.ForeignKey("notes.id"), nullable=False)
+    note_id = db.Column(db.Integer, db.ForeignKey("notes.id", ondelete="CASCADE"), nullable=False)
 
     note = db.relationship("Note", back_populates="flashcards")
 
@@ -123,20 +162,31 @@ class Flashcard(db.Model, BaseModel):
 # =========================================================
 class Question(db.Model, BaseModel):
     __tablename__ = "questions"
+    __table_args__ = (
+        # Covers the duplicate-title-per-author check and author listing
+        db.Index("ix_questions_author_title", "author_id", "title"),
+    )
 
     title = db.Column(db.String(255), nullable=False)
     body = db.Column(db.Text, nullable=False)
-    author_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    author_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
 
     author = db.relationship("User", back_populates="questions")
-    answers = db.relationship("Answer", back_populates="question", cascade="all, delete-orphan")
+    answers = db.relationship("Answer", back_populates="question", cascade="all, delete-orphan", passive_deletes=True)
 
 class Vote(db.Model):
     __tablename__ = "votes"
+    __table_args__ = (
+        # One vote per user per answer — the conflict target for the
+        # upsert in vote_answer
+        db.UniqueConstraint("user_id", "answer_id", name="uq_votes_user_answer"),
+        # Covers the per-answer tally aggregates in the vote views
+        db.Index("ix_vote_answer_type", "answer_id", "vote_type"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
-    answer_id = db.Column(db.Integer, db.ForeignKey("answers.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    answer_id = db.Column(db.Integer, db.ForeignKey("answers.id", ondelete="CASCADE"), nullable=False, index=True)
     vote_type = db.Column(db.String(10), nullable=False)  # "up" or "down"
 
     user = db.relationship("User", back_populates="votes")
@@ -145,15 +195,19 @@ class Vote(db.Model):
 
 class Answer(db.Model, BaseModel):
     __tablename__ = "answers"
+    __table_args__ = (
+        # Covers the "answers for a question, newest first" list query
+        db.Index("ix_answers_qid_created", "question_id", "created_at"),
+    )
 
     body = db.Column(db.Text, nullable=False)
-    question_id = db.Column(db.Integer, db.ForeignKey("questions.id"), nullable=False)
-    author_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey("questions.id", ondelete="CASCADE"), nullable=False, index=True)
+    author_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     is_best = db.Column(db.Boolean, default=False)
 
     question = db.relationship("Question", back_populates="answers")
     author = db.relationship("User", back_populates="answers")
-    votes = db.relationship("Vote", back_populates="answer", cascade="all, delete-orphan")
+    votes = db.relationship("Vote", back_populates="answer", cascade="all, delete-orphan", passive_deletes=True)
 
 
 
@@ -162,17 +216,30 @@ class Answer(db.Model, BaseModel):
 # =========================================================
 class Assignment(db.Model, BaseModel):
     __tablename__ = "assignments"
+    __table_args__ = (
+        # Covers the per-unit active listing
+        db.Index("ix_assignments_unit_active", "unit_id", "is_active"),
+        # Enforces (and indexes) the "no duplicate active title per unit"
+        # rule atomically, instead of a racy check-then-insert in the view
+        db.Index(
+            "uq_assignments_title_unit_active",
+            "title",
+            "unit_id",
+            unique=True,
+            sqlite_where=db.text("is_active = 1"),
+        ),
+    )
 
     title = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text)
     due_date = db.Column(db.DateTime)
     file_path = db.Column(db.String(255))
     is_active = db.Column(db.Boolean, default=True, nullable=False)
-    unit_id = db.Column(db.Integer, db.ForeignKey("units.id"), nullable=False)
+    unit_id = db.Column(db.Integer, db.ForeignKey("units.id", ondelete="CASCADE"), nullable=False, index=True)
 
     # Relationships
     unit = db.relationship("Unit", back_populates="assignments")
-    submissions = db.relationship("Submission", back_populates="assignment", cascade="all, delete-orphan")
+    submissions = db.relationship("Submission", back_populates="assignment", cascade="all, delete-orphan", passive_deletes=True)
 
     def __repr__(self):
         return f"<Assignment {self.title} active={self.is_active}>"
@@ -180,24 +247,37 @@ class Assignment(db.Model, BaseModel):
 
 class Submission(db.Model, BaseModel):
     __tablename__ = "submissions"
+    __table_args__ = (
+        # Covers the attempt count and per-student submission listing
+        db.Index("ix_submissions_student_assignment", "student_id", "assignment_id"),
+    )
 
     content = db.Column(db.Text)
     file_path = db.Column(db.String(255))
-    student_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
-    assignment_id = db.Column(db.Integer, db.ForeignKey("assignments.id"), nullable=False)
+    # SHA-256 of the uploaded file — lets identical re-uploads reuse the
+    # already-written copy
+    file_sha256 = db.Column(db.String(64), index=True)
+    student_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    assignment_id = db.Column(db.Integer, db.ForeignKey("assignments.id", ondelete="CASCADE"), nullable=False, index=True)
 
     student = db.relationship("User", back_populates="submissions")
     assignment = db.relationship("Assignment", back_populates="submissions")
-    grade = db.relationship("Grade", back_populates="submission", uselist=False, cascade="all, delete-orphan")
+    grade = db.relationship("Grade", back_populates="submission", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
 
 
 class Grade(db.Model, BaseModel):
     __tablename__ = "grades"
+    __table_args__ = (
+        # One grade per submission — also the index the duplicate check
+        # and student lookup probe
+        db.UniqueConstraint("submission_id", name="uq_grades_submission"),
+        db.Index("ix_grades_instructor", "instructor_id"),
+    )
 
     score = db.Column(db.Float, nullable=False)
     feedback = db.Column(db.Text)
-    submission_id = db.Column(db.Integer, db.ForeignKey("submissions.id"), nullable=False)
-    instructor_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    submission_id = db.Column(db.Integer, db.ForeignKey("submissions.id", ondelete="CASCADE"), nullable=False)
+    instructor_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
 
     submission = db.relationship("Submission", back_populates="grade")
     instructor = db.relationship("User", back_populates="given_grades")
@@ -211,7 +291,7 @@ class Notification(db.Model, BaseModel):
 
     message = db.Column(db.String(255), nullable=False)
     is_read = db.Column(db.Boolean, default=False)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"))
 
     user = db.relationship("User", back_populates="notifications")
 
@@ -222,7 +302,7 @@ class Notification(db.Model, BaseModel):
 class ActivityLog(db.Model, BaseModel):
     __tablename__ = "activity_logs"
 
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"))
     action = db.Column(db.String(255), nullable=False)
     target_type = db.Column(db.String(50))  # e.g., 'Course', 'Note', 'Assignment'
     target_id = db.Column(db.Integer)
@@ -235,19 +315,11 @@ class ActivityLog(db.Model, BaseModel):
 # =========================================================
 # Automatic timestamp updates for parents
 # =========================================================
-def touch(mapper, connection, target):
-    """Auto-update parent timestamps when child changes."""
-    if hasattr(target, "unit") and target.unit:
-        target.unit.updated_at = datetime.utcnow()
-    elif hasattr(target, "course") and target.course:
-        target.course.updated_at = datetime.utcnow()
-    elif hasattr(target, "assignment") and target.assignment:
-        target.assignment.updated_at = datetime.utcnow()
-
-
-for model in [Note, Flashcard, Assignment, Submission, Grade]:
-    event.listen(model, "after_insert", touch)
-    event.listen(model, "after_update", touch)
-    event.listen(model, "after_delete", touch)
+# Parent updated_at bumps (note/assignment -> unit, submission ->
+# assignment) are handled by database triggers — see the
+# "parent touch triggers" migration. The old Python event listeners
+# dirtied the parent row on every child write and forced an extra
+# UPDATE through the session; the triggers run inside the same
+# transaction as the child write with no round-trip from Python.
 
 
@@ -0,0 +1,113 @@
+"""Background work shared by the view modules.
+
+A small process-wide thread pool keeps slow filesystem work (multi-MB
+upload writes) off the request thread. Jobs that need the database are
+handed the real app object and open their own app context.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+from models import db
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="studybuddy-bg")
+
+# Long-running AI generation jobs get their own pool — they can pin a
+# thread for the length of an OpenAI call, and nothing latency-
+# sensitive should ever wait behind one on the shared executor.
+ai_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="studybuddy-ai")
+
+# Small dedicated pool for password KDF runs. Requests block on the
+# result, so this must not share a queue with uploads or AI jobs; its
+# size is also the cap on concurrent memory-hard hashes.
+hash_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="studybuddy-hash")
+
+# Caps in-flight OpenAI calls across the process. When every slot is
+# taken the AI routes shed load with a 503 instead of queueing more
+# multi-second requests onto pinned workers.
+AI_CONCURRENCY = int(os.getenv("AI_CONCURRENCY", "8"))
+ai_slots = threading.BoundedSemaphore(AI_CONCURRENCY)
+
+
+def hash_stream(stream):
+    """SHA-256 a file stream in 1MB chunks, then rewind it.
+
+    OpenSSL dispatches to the CPU's SHA extensions where available, so
+    this is far cheaper than the disk write it can let us skip.
+    """
+    h = hashlib.sha256()
+    while True:
+        chunk = stream.read(1 << 20)
+        if not chunk:
+            break
+        h.update(chunk)
+    stream.seek(0)
+    return h.hexdigest()
+
+
+def spool_upload(file):
+    """Copy an incoming upload into a temp spool so the request can
+    finish while the real disk write happens in the background.
+
+    Small files stay in memory; anything over 1MB rolls over to a
+    temp file on disk.
+    """
+    tmp = tempfile.SpooledTemporaryFile(max_size=1 << 20)
+    shutil.copyfileobj(file.stream, tmp)
+    tmp.seek(0)
+    return tmp
+
+
+def remove_file_async(path):
+    """Unlink a file on the executor instead of the request thread.
+
+    try/unlink is one syscall where exists-then-remove is two, and the
+    FileNotFoundError case (already gone) is not an error here. Other
+    OSErrors are logged — nobody looks at the future.
+    """
+    def _unlink():
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.exception("Background unlink of %s failed", path)
+
+    executor.submit(_unlink)
+
+
+def persist_upload(app, tmp, final_path, model, pk, field="file_path"):
+    """Write a spooled upload to its final path, then fill in the row's
+    path column. Runs on the executor, never on a request thread.
+
+    The caller discards the future, so any failure (disk full,
+    permissions) is logged here — the row simply keeps its NULL path /
+    unset file_ready, which the serializers already treat as "no file".
+    """
+    try:
+        try:
+            with open(final_path, "wb") as dst:
+                shutil.copyfileobj(tmp, dst)
+        finally:
+            tmp.close()
+
+        with app.app_context():
+            obj = db.session.get(model, pk)
+            if obj is not None:
+                setattr(obj, field, final_path)
+                # models that track readiness (Note) get flipped in the
+                # same commit as the path
+                if hasattr(obj, "file_ready"):
+                    obj.file_ready = True
+                db.session.commit()
+    except Exception:
+        logger.exception(
+            "Background write of %s for %s id=%s failed",
+            final_path, model.__name__, pk,
+        )
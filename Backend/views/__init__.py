@@ -1,12 +1,27 @@
-from .user import *
-from .answer import *
-from .assignment import *
-from .course import *
-from .flashcard import *
-from .grade import *
-from .note import *
-from .question import *
-from .submission import *
-from .unit import *
-from .vote import *
+from importlib import import_module
 
+# Map each blueprint to the module that defines it so view modules are
+# only imported when the blueprint is first accessed (PEP 562). Keeps
+# `import views` / `from views import user_bp` cheap on cold start.
+_BLUEPRINT_MODULES = {
+    "user_bp": ".user",
+    "answer_bp": ".answer",
+    "assignment_bp": ".assignment",
+    "course_bp": ".course",
+    "flashcard_bp": ".flashcard",
+    "grade_bp": ".grade",
+    "note_bp": ".note",
+    "question_bp": ".question",
+    "submission_bp": ".submission",
+    "unit_bp": ".unit",
+    "vote_bp": ".vote",
+}
+
+__all__ = list(_BLUEPRINT_MODULES)
+
+
+def __getattr__(name):
+    module_name = _BLUEPRINT_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(module_name, __name__), name)
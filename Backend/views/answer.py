@@ -1,6 +1,8 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from models import db, Answer, Question, User
-from datetime import datetime
+from sqlalchemy import select, lambda_stmt
+from sqlalchemy.orm import joinedload, load_only
+import orjson
 
 answer_bp = Blueprint("answer_bp", __name__)
 
@@ -19,11 +21,11 @@ def create_answer():
     if not all([body, question_id, author_id]):
         return jsonify({"error": "body, question_id, and author_id are required"}), 400
 
-    question = Question.query.get(question_id)
+    question = db.session.get(Question, question_id)
     if not question:
         return jsonify({"error": "Question not found"}), 404
 
-    author = User.query.get(author_id)
+    author = db.session.get(User, author_id)
     if not author:
         return jsonify({"error": "Author not found"}), 404
 
@@ -31,9 +33,7 @@ def create_answer():
     new_answer = Answer(
         body=body,
         question_id=question.id,
-        author_id=author.id,
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow()
+        author_id=author.id
     )
 
     db.session.add(new_answer)
@@ -51,12 +51,37 @@ def create_answer():
 # ==========================================================
 @answer_bp.route("/questions/<int:question_id>/answers", methods=["GET"])
 def get_answers_for_question(question_id):
-    question = Question.query.get(question_id)
+    question = db.session.get(Question, question_id)
     if not question:
         return jsonify({"error": "Question not found"}), 404
 
-    answers = Answer.query.filter_by(question_id=question_id).order_by(Answer.created_at.desc()).all()
-    return jsonify([serialize_answer(a) for a in answers]), 200
+    # Eager-load author and question so serialize_answer doesn't trigger
+    # two lazy SELECTs per row (classic N+1 on long answer lists).
+    # load_only trims the joined rows to the columns the serializer
+    # actually reads — no bio/password/body blobs ride along.
+    # lambda_stmt caches the compiled SQL across requests — only the
+    # question_id bind value changes per call.
+    stmt = lambda_stmt(
+        lambda: select(Answer)
+        .options(
+            joinedload(Answer.author).load_only(User.id, User.username),
+            joinedload(Answer.question).load_only(Question.id, Question.title),
+        )
+        .where(Answer.question_id == question_id)
+        .order_by(Answer.created_at.desc())
+    )
+
+    def generate():
+        yield b"["
+        first = True
+        for a in db.session.scalars(stmt, execution_options={"yield_per": 200}):
+            if not first:
+                yield b","
+            first = False
+            yield orjson.dumps(serialize_answer(a))
+        yield b"]"
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
 
 
 # ==========================================================
@@ -73,7 +98,7 @@ def update_answer(answer_id):
     if not new_body:
         return jsonify({"error": "New answer text (body) is required"}), 400
 
-    answer = Answer.query.get(answer_id)
+    answer = db.session.get(Answer, answer_id)
     if not answer:
         return jsonify({"error": "Answer not found"}), 404
 
@@ -82,8 +107,7 @@ def update_answer(answer_id):
         return jsonify({"error": "You can only edit your own answer."}), 403
 
     answer.body = new_body
-    answer.updated_at = datetime.utcnow()
-    db.session.commit()
+    # committed once by the request teardown
 
     return jsonify({
         "success": True,
@@ -103,7 +127,7 @@ def delete_answer(answer_id):
     if not author_id:
         return jsonify({"error": "author_id is required"}), 400
 
-    answer = Answer.query.get(answer_id)
+    answer = db.session.get(Answer, answer_id)
     if not answer:
         return jsonify({"error": "Answer not found"}), 404
 
@@ -129,7 +153,7 @@ def serialize_answer(answer):
         },
         "author": {
             "id": answer.author.id,
-            "name": getattr(answer.author, "name", None)
+            "name": answer.author.username
         },
         "created_at": answer.created_at.isoformat() if answer.created_at else None,
         "updated_at": answer.updated_at.isoformat() if answer.updated_at else None
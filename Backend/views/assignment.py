@@ -1,6 +1,10 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
 from models import db, Assignment, Unit
+from tasks import executor, spool_upload, persist_upload
+from sqlalchemy import select, lambda_stmt, exists
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime
+import orjson
 import os
 from werkzeug.utils import secure_filename
 
@@ -55,7 +59,7 @@ def create_assignment():
         return jsonify({"error": "due_date is required and must be in ISO format (e.g. 2025-10-31T23:59:00)"}), 400
 
     # ensure unit exists
-    unit = Unit.query.get(unit_id)
+    unit = db.session.get(Unit, unit_id)
     if not unit:
         return jsonify({"error": "Unit not found"}), 404
 
@@ -65,8 +69,18 @@ def create_assignment():
     except Exception:
         return jsonify({"error": "Invalid due_date format. Use ISO format like 'YYYY-MM-DD' or 'YYYY-MM-DDTHH:MM:SS'."}), 400
 
-    # prevent duplicate active assignment with same title in same unit
-    duplicate = Assignment.query.filter_by(title=title.strip(), unit_id=unit.id, is_active=True).first()
+    # Fast-path duplicate check: SELECT EXISTS(...) is an index probe
+    # with no row hydration. The unique index remains the backstop for
+    # concurrent inserts.
+    duplicate = db.session.scalar(
+        select(
+            exists().where(
+                Assignment.title == title.strip(),
+                Assignment.unit_id == unit.id,
+                Assignment.is_active == True,
+            )
+        )
+    )
     if duplicate:
         return jsonify({"error": "An active assignment with the same title already exists for this unit."}), 400
 
@@ -74,15 +88,15 @@ def create_assignment():
     # File validation (only if file provided)
     # -----------------------
     file_path = None
+    tmp = None
     if file:
         if not allowed_file(file.filename):
             return jsonify({"error": f"Invalid file type. Allowed: {', '.join(sorted(ALLOWED_EXTENSIONS))}"}), 400
         # prepare filename (prefix timestamp to avoid collisions)
         filename = secure_filename(f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{file.filename}")
         file_path = os.path.join(UPLOAD_FOLDER, filename)
-        # save file after validations
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-        file.save(file_path)
+        # spool now, write to disk in the background after the commit
+        tmp = spool_upload(file)
 
     # -----------------------
     # Create assignment
@@ -91,15 +105,29 @@ def create_assignment():
         title=title.strip(),
         description=description,
         due_date=due_date,
-        file_path=file_path,
+        file_path=None,  # filled in by the background write
         unit_id=unit.id,
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow(),
         is_active=True
     )
 
+    # Duplicate (same active title in same unit) is enforced by the
+    # unique index — one INSERT instead of check-then-insert, no race
     db.session.add(new_assignment)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        if tmp is not None:
+            tmp.close()
+        return jsonify({"error": "An active assignment with the same title already exists for this unit."}), 400
+
+    # Disk write happens off the request thread; the worker fills in
+    # file_path once the bytes are safely down
+    if tmp is not None:
+        executor.submit(
+            persist_upload, current_app._get_current_object(),
+            tmp, file_path, Assignment, new_assignment.id,
+        )
 
     return jsonify({
         "success": True,
@@ -123,9 +151,34 @@ def create_assignment():
 # ===============================
 @assignment_bp.route("/assignments", methods=["GET"])
 def get_all_assignments():
-    """View all active assignments."""
-    assignments = Assignment.query.filter_by(is_active=True).all()
-    return jsonify([serialize_assignment(a) for a in assignments]), 200
+    """View all active assignments (streamed, constant memory)."""
+    # Column projection: no ORM entities are built for this read-only
+    # list, and the compiled statement is cached via lambda_stmt
+    stmt = lambda_stmt(
+        lambda: select(
+            Assignment.id,
+            Assignment.title,
+            Assignment.description,
+            Assignment.due_date,
+            Assignment.file_path,
+            Assignment.unit_id,
+            Assignment.is_active,
+            Assignment.created_at,
+            Assignment.updated_at,
+        ).where(Assignment.is_active == True)
+    )
+
+    def generate():
+        yield b"["
+        first = True
+        for a in db.session.execute(stmt, execution_options={"yield_per": 200}):
+            if not first:
+                yield b","
+            first = False
+            yield orjson.dumps(serialize_assignment(a))
+        yield b"]"
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
 
 
 # ===============================
@@ -134,7 +187,12 @@ def get_all_assignments():
 @assignment_bp.route("/assignments/unit/<int:unit_id>", methods=["GET"])
 def get_assignments_by_unit(unit_id):
     """Fetch all assignments for a specific unit."""
-    assignments = Assignment.query.filter_by(unit_id=unit_id, is_active=True).all()
+    stmt = lambda_stmt(
+        lambda: select(Assignment).where(
+            Assignment.unit_id == unit_id, Assignment.is_active == True
+        )
+    )
+    assignments = db.session.scalars(stmt).all()
     if not assignments:
         return jsonify({"message": "No assignments found for this unit"}), 404
     return jsonify([serialize_assignment(a) for a in assignments]), 200
@@ -146,7 +204,7 @@ def get_assignments_by_unit(unit_id):
 @assignment_bp.route("/assignments/<int:assignment_id>", methods=["GET"])
 def get_assignment(assignment_id):
     """Fetch details for a specific assignment."""
-    assignment = Assignment.query.get(assignment_id)
+    assignment = db.session.get(Assignment, assignment_id)
     if not assignment:
         return jsonify({"error": "Assignment not found"}), 404
     return jsonify(serialize_assignment(assignment)), 200
@@ -158,33 +216,72 @@ def get_assignment(assignment_id):
 @assignment_bp.route("/assignments/<int:assignment_id>", methods=["PATCH"])
 def update_assignment(assignment_id):
     """Update assignment details or replace file."""
-    assignment = Assignment.query.get(assignment_id)
+    assignment = db.session.get(Assignment, assignment_id)
     if not assignment:
         return jsonify({"error": "Assignment not found"}), 404
 
     data = request.form
     file = request.files.get("file")
 
-    # Update text fields
-    assignment.title = data.get("title", assignment.title)
-    assignment.description = data.get("description", assignment.description)
-
-    # Update due date if provided
+    # Parse the due date before mutating anything, so a 400 here can't
+    # leave half-applied changes for the teardown commit to pick up
+    due_date = None
     if data.get("due_date"):
         try:
-            assignment.due_date = datetime.fromisoformat(data.get("due_date"))
+            due_date = datetime.fromisoformat(data.get("due_date"))
         except ValueError:
             return jsonify({"error": "Invalid date format"}), 400
 
-    # Replace file if uploaded
+    # Renaming onto another active assignment's title in the unit is a
+    # 400, not a constraint blow-up — probe excludes this row; the
+    # partial unique index backstops the race
+    new_title = data.get("title")
+    new_title = new_title.strip() if new_title else assignment.title
+    if new_title != assignment.title:
+        duplicate = db.session.scalar(
+            select(
+                exists().where(
+                    Assignment.title == new_title,
+                    Assignment.unit_id == assignment.unit_id,
+                    Assignment.is_active == True,
+                    Assignment.id != assignment.id,
+                )
+            )
+        )
+        if duplicate:
+            return jsonify({"error": "An active assignment with the same title already exists for this unit."}), 400
+
+    # Update text fields
+    assignment.title = new_title
+    assignment.description = data.get("description", assignment.description)
+    if due_date is not None:
+        assignment.due_date = due_date
+
+    # Replace file if uploaded (written in the background; file_path
+    # flips to the new file once the write completes)
+    tmp = None
+    path = None
     if file:
         filename = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{file.filename}"
         path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(path)
-        assignment.file_path = path
+        tmp = spool_upload(file)
+
+    # committed once by the request teardown; flush now so the worker's
+    # UPDATE below can't race an unflushed row state
+    try:
+        db.session.flush()
+    except IntegrityError:
+        # concurrent rename landed the same title between probe and flush
+        db.session.rollback()
+        if tmp is not None:
+            tmp.close()
+        return jsonify({"error": "An active assignment with the same title already exists for this unit."}), 400
 
-    assignment.updated_at = datetime.utcnow()
-    db.session.commit()
+    if tmp is not None:
+        executor.submit(
+            persist_upload, current_app._get_current_object(),
+            tmp, path, Assignment, assignment.id,
+        )
 
     return jsonify({
         "success": True,
@@ -196,13 +293,12 @@ def update_assignment(assignment_id):
 @assignment_bp.route("/assignments/<int:assignment_id>/toggle", methods=["PATCH"])
 def toggle_assignment(assignment_id):
     """Toggle assignment active/inactive status"""
-    assignment = Assignment.query.get(assignment_id)
+    assignment = db.session.get(Assignment, assignment_id)
     if not assignment:
         return jsonify({"error": "Assignment not found"}), 404
 
     # Flip active status
     assignment.is_active = not assignment.is_active
-    db.session.commit()
 
     status = "activated" if assignment.is_active else "deactivated"
 
@@ -1,14 +1,17 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
 from werkzeug.utils import secure_filename
 from models import db, Course
+from tasks import executor, spool_upload, persist_upload
+from sqlalchemy import select, lambda_stmt, func
+import orjson
 import os
-from datetime import datetime
 
 course_bp = Blueprint("course_bp", __name__)
 
-# Folder for uploaded thumbnails
+# Folder for uploaded thumbnails — created once at import, not per request
 UPLOAD_FOLDER = "uploads/thumbnails"
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 
 # ===== Helper Function =====
@@ -35,34 +38,37 @@ def course_to_dict(course):
 def create_course():
     title = request.form.get("title")
     description = request.form.get("description")
-    thumbnail = None
 
     if not title:
         return jsonify({"error": "Course title is required"}), 400
 
-    # Handle thumbnail upload (optional)
+    # Handle thumbnail upload (optional) — spool now, write in background
+    tmp = None
+    thumbnail_path = None
     if "thumbnail" in request.files:
         file = request.files["thumbnail"]
         if file and allowed_file(file.filename):
             filename = secure_filename(file.filename)
-            os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-            file_path = os.path.join(UPLOAD_FOLDER, filename)
-            file.save(file_path)
-            thumbnail = file_path
+            thumbnail_path = os.path.join(UPLOAD_FOLDER, filename)
+            tmp = spool_upload(file)
         else:
             return jsonify({"error": "Invalid thumbnail file type"}), 400
 
     new_course = Course(
         title=title,
         description=description,
-        thumbnail=thumbnail,
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow(),
+        thumbnail=None,  # filled in by the background write
     )
 
     db.session.add(new_course)
     db.session.commit()
 
+    if tmp is not None:
+        executor.submit(
+            persist_upload, current_app._get_current_object(),
+            tmp, thumbnail_path, Course, new_course.id, "thumbnail",
+        )
+
     return jsonify({
         "message": "Course created successfully",
         "course": course_to_dict(new_course)
@@ -72,23 +78,69 @@ def create_course():
 # ===== Get All Active Courses =====
 @course_bp.route("/courses", methods=["GET"])
 def get_courses():
-    courses = Course.query.filter_by(is_active=True).all()
-    return jsonify([course_to_dict(c) for c in courses]), 200
+    # Cheap freshness probe first: one aggregate over a small table
+    # lets a matching If-None-Match return 304 without running the list
+    # query or streaming anything. The row count is part of the token —
+    # MAX(updated_at) alone misses deactivations/deletes of rows that
+    # weren't the newest — and the raw timestamp keeps sub-second
+    # precision where the backend records it.
+    count, latest = db.session.execute(
+        select(func.count(Course.id), func.max(Course.updated_at))
+        .where(Course.is_active == True)
+    ).one()
+    etag = f"courses-{count}-{latest.timestamp()}" if latest else "courses-empty"
+    if etag in request.if_none_match:
+        return Response(status=304)
+
+    # Stream the array instead of materializing every row + dict + the
+    # final JSON string in memory. Selecting columns (not the entity)
+    # skips ORM object construction and identity-map bookkeeping per row.
+    stmt = lambda_stmt(
+        lambda: select(
+            Course.id,
+            Course.title,
+            Course.description,
+            Course.thumbnail,
+            Course.is_active,
+            Course.created_at,
+            Course.updated_at,
+        ).where(Course.is_active == True)
+    )
+
+    def generate():
+        yield b"["
+        first = True
+        for course in db.session.execute(stmt, execution_options={"yield_per": 200}):
+            if not first:
+                yield b","
+            first = False
+            yield orjson.dumps(course_to_dict(course))
+        yield b"]"
+
+    resp = Response(stream_with_context(generate()), mimetype="application/json")
+    resp.set_etag(etag)
+    return resp
 
 
 # ===== Get a Single Course =====
 @course_bp.route("/courses/<int:course_id>", methods=["GET"])
 def get_course(course_id):
-    course = Course.query.get(course_id)
+    course = db.session.get(Course, course_id)
     if not course or not course.is_active:
         return jsonify({"error": "Course not found"}), 404
-    return jsonify(course_to_dict(course)), 200
+    resp = jsonify(course_to_dict(course))
+    # ETag + Last-Modified derived from updated_at; make_conditional
+    # turns a matching revalidation into an empty 304
+    if course.updated_at:
+        resp.set_etag(f"course-{course.id}-{int(course.updated_at.timestamp())}")
+        resp.last_modified = course.updated_at
+    return resp.make_conditional(request)
 
 
 # ===== Update a Course =====
 @course_bp.route("/courses/<int:course_id>", methods=["PATCH"])
 def update_course(course_id):
-    course = Course.query.get(course_id)
+    course = db.session.get(Course, course_id)
     if not course:
         return jsonify({"error": "Course not found"}), 404
 
@@ -100,7 +152,6 @@ def update_course(course_id):
         file = request.files["thumbnail"]
         if file and allowed_file(file.filename):
             filename = secure_filename(file.filename)
-            os.makedirs(UPLOAD_FOLDER, exist_ok=True)
             file_path = os.path.join(UPLOAD_FOLDER, filename)
             file.save(file_path)
             course.thumbnail = file_path
@@ -109,9 +160,8 @@ def update_course(course_id):
 
     course.title = title
     course.description = description
-    course.updated_at = datetime.utcnow()
 
-    db.session.commit()
+    # committed once by the request teardown
 
     return jsonify({
         "message": "Course updated successfully",
@@ -122,13 +172,11 @@ def update_course(course_id):
 # ===== Soft Deactivate Course =====
 @course_bp.route("/courses/<int:course_id>/deactivate", methods=["PATCH"])
 def deactivate_course(course_id):
-    course = Course.query.get(course_id)
+    course = db.session.get(Course, course_id)
     if not course:
         return jsonify({"error": "Course not found"}), 404
 
     course.is_active = False
-    course.updated_at = datetime.utcnow()
-    db.session.commit()
 
     return jsonify({
         "message": f"Course '{course.title}' deactivated successfully",
@@ -139,13 +187,11 @@ def deactivate_course(course_id):
 # ===== Reactivate Course =====
 @course_bp.route("/courses/<int:course_id>/reactivate", methods=["PATCH"])
 def reactivate_course(course_id):
-    course = Course.query.get(course_id)
+    course = db.session.get(Course, course_id)
     if not course:
         return jsonify({"error": "Course not found"}), 404
 
     course.is_active = True
-    course.updated_at = datetime.utcnow()
-    db.session.commit()
 
     return jsonify({
         "message": f"Course '{course.title}' reactivated successfully",
@@ -156,12 +202,11 @@ def reactivate_course(course_id):
 # ===== Hard Delete Course =====
 @course_bp.route("/courses/<int:course_id>", methods=["DELETE"])
 def delete_course(course_id):
-    course = Course.query.get(course_id)
+    course = db.session.get(Course, course_id)
     if not course:
         return jsonify({"error": "Course not found"}), 404
 
     db.session.delete(course)
-    db.session.commit()
 
     return jsonify({"message": "Course permanently deleted"}), 200
 
@@ -1,79 +1,141 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, url_for, current_app
 from models import db, Note, Flashcard
-from datetime import datetime
+from cache import cache
+from tasks import ai_executor, ai_slots
 from openai import OpenAI
-import os, json, re
+import hashlib
+import logging
+import threading
+import time
+import uuid
+import os, json
+
+logger = logging.getLogger(__name__)
 
 flashcard_bp = Blueprint("flashcard_bp", __name__)
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# In-process generation job registry: job_id -> {"state": ..., ...}.
+# Entries are small dicts; a single-process deployment doesn't need a
+# broker-backed result store. Finished entries (which hold the full
+# flashcard payload) are kept for _JOB_TTL so pollers can collect
+# them, then pruned when new jobs are created — otherwise the registry
+# grows for the life of the process.
+_jobs = {}
+_jobs_lock = threading.Lock()
+_JOB_TTL = 600  # seconds a done/failed job stays pollable
+
+
+def _prune_jobs():
+    """Drop terminal jobs past their TTL. Caller holds _jobs_lock."""
+    cutoff = time.monotonic() - _JOB_TTL
+    stale = [
+        job_id for job_id, job in _jobs.items()
+        if job["state"] in ("done", "failed") and job["finished_at"] < cutoff
+    ]
+    for job_id in stale:
+        del _jobs[job_id]
+
+# Initialize OpenAI client — a hard timeout bounds how long a worker
+# can stay pinned on one generation
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=60.0)
+
+# Reused decoder for raw_decode-based extraction below
+_json_decoder = json.JSONDecoder()
+
+# Static instructions live in a constant system message so the provider's
+# automatic prompt cache can reuse the prefix across requests — only the
+# note text varies per call
+FLASHCARD_SYSTEM_PROMPT = """Generate 5 multiple-choice flashcards from the note the user provides.
+Each flashcard must be in this exact JSON format:
+[
+  {
+    "question": "What is ...?",
+    "options": ["Option A", "Option B", "Option C", "Option D"],
+    "answer": "Option B"
+  }
+]
+Respond with only the JSON array, no surrounding prose."""
 
 # ===== Helper Function: Extract JSON safely =====
 def extract_json(text):
-    """Try to extract a valid JSON array from the AI response text."""
+    """Try to extract a valid JSON array from the AI response text.
+
+    raw_decode parses forward from each '[' in one linear pass and stops
+    at the array's real end — no greedy regex spanning the whole blob
+    and backtracking when a stray bracket appears.
+    """
+    start = text.find("[")
+    while start != -1:
+        try:
+            obj, _ = _json_decoder.raw_decode(text, start)
+            return obj
+        except json.JSONDecodeError:
+            start = text.find("[", start + 1)
     try:
-        match = re.search(r'\[.*\]', text, re.DOTALL)
-        if match:
-            return json.loads(match.group(0))
-        else:
-            return json.loads(text)
+        return json.loads(text)
     except Exception as e:
-        print("JSON parse error:", e)
+        # lazy %s: the message isn't built unless DEBUG is enabled
+        logger.debug("JSON parse error: %s", e)
         return None
 
 
-# ===== Route: Generate Flashcards =====
-@flashcard_bp.route("/flashcards/generate/<int:note_id>", methods=["POST"])
-def generate_flashcards(note_id):
-    """Generate multiple-choice flashcards from a note using OpenAI."""
-    note = Note.query.get(note_id)
-    if not note:
-        return jsonify({"error": "Note not found"}), 404
-
-    # 1️ Ensure the note has text content
-    if not note.content:
-        return jsonify({"error": "Note has no text content"}), 400
-
-    text = note.content
-
-    # 2️ AI Prompt for multiple-choice flashcards
-    prompt = f"""
-    Generate 5 multiple-choice flashcards from this note.
-    Each flashcard must be in this exact JSON format:
-    [
-      {{
-        "question": "What is ...?",
-        "options": ["Option A", "Option B", "Option C", "Option D"],
-        "answer": "Option B"
-      }}
-    ]
+# ===== Helper Function: Incremental parse of a streamed response =====
+def iter_streamed_objects(stream):
+    """Yield each complete {...} object as it closes in a chat stream.
 
-    Text:
-    {text}
+    Tracks brace nesting (quote-aware) across deltas, so parsing overlaps
+    model generation instead of waiting for the whole completion and
+    regex-extracting afterwards.
     """
+    buf = ""
+    pos = 0
+    depth = 0
+    start = None
+    in_str = False
+    escaped = False
+    for chunk in stream:
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        buf += delta
+        while pos < len(buf):
+            ch = buf[pos]
+            if in_str:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_str = False
+            elif ch == '"':
+                in_str = True
+            elif ch == "{":
+                if depth == 0:
+                    start = pos
+                depth += 1
+            elif ch == "}" and depth:
+                depth -= 1
+                if depth == 0 and start is not None:
+                    try:
+                        yield json.loads(buf[start:pos + 1])
+                    except json.JSONDecodeError:
+                        pass
+                    start = None
+            pos += 1
 
-    try:
-        # 3️ Send to OpenAI
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-        )
-
-        ai_output = response.choices[0].message.content.strip()
-        print("\n=== AI OUTPUT ===\n", ai_output)
 
-        # 4️ Parse JSON safely
-        flashcards_data = extract_json(ai_output)
-        if not flashcards_data:
-            return jsonify({"error": "Failed to parse AI response"}), 500
+# ===== Helper Function: dedupe + bulk insert (shared with the worker) =====
+def store_flashcards(note_id, flashcards_data):
+    """Dedupe parsed flashcards against the note and bulk-insert them.
 
-    except Exception as e:
-        # print("OpenAI error:", e)
-        return jsonify({"error": "Failed to generate flashcards"}), 500
+    One SELECT for all existing questions on the note, then in-memory
+    membership checks — instead of one round-trip per flashcard. Leaves
+    the commit to the caller.
+    """
+    existing_qs = {
+        q for (q,) in db.session.query(Flashcard.question).filter_by(note_id=note_id).all()
+    }
 
-    # 5️⃣ Save generated flashcards to database (avoid duplicates)
     generated_flashcards = []
     for fc in flashcards_data:
         question = fc.get("question")
@@ -83,30 +145,149 @@ def generate_flashcards(note_id):
         if not (question and answer and options):
             continue
 
-        # Skip duplicates
-        existing = Flashcard.query.filter_by(note_id=note.id, question=question).first()
-        if existing:
+        # Skip duplicates (also guards against repeats within this batch)
+        if question in existing_qs:
             continue
+        existing_qs.add(question)
 
+        # timestamps come from the database (server_default/onupdate)
         new_fc = Flashcard(
             question=question,
             answer=answer,
             options=options,  # multiple-choice options
-            note_id=note.id,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
+            note_id=note_id,
         )
-
-        db.session.add(new_fc)
         generated_flashcards.append(new_fc)
 
-    db.session.commit()
+    # add_all + one flush: bulk_save_objects would skip fetching the
+    # server-side created_at (the serializer would emit null), and the
+    # batch is small enough that unit-of-work bookkeeping is noise.
+    # After the caller's commit the attached rows reload with real
+    # timestamps.
+    db.session.add_all(generated_flashcards)
+    db.session.flush()
+    return generated_flashcards
+
 
-    return jsonify({
+def run_generation_job(app, job_id, note_id, cache_key):
+    """Worker body for a queued generation: OpenAI call, dedupe, insert.
+
+    Runs on the AI executor; results land in the job registry for
+    the poll endpoint to report.
+    """
+    with _jobs_lock:
+        _jobs[job_id]["state"] = "running"
+    try:
+        with app.app_context():
+            note = db.session.get(Note, note_id)
+            if note is None or not note.content:
+                raise ValueError("Note no longer has text content")
+
+            # Workers queue on the AI slots rather than shedding — the
+            # client already has its 202 and is polling
+            ai_slots.acquire()
+            try:
+                stream = client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=[
+                        {"role": "system", "content": FLASHCARD_SYSTEM_PROMPT},
+                        {"role": "user", "content": note.content},
+                    ],
+                    temperature=0.7,
+                    stream=True,
+                )
+                flashcards_data = list(iter_streamed_objects(stream))
+            finally:
+                ai_slots.release()
+
+            if not flashcards_data:
+                raise ValueError("Failed to parse AI response")
+
+            cache.set(cache_key, flashcards_data, ttl=3600)
+            generated = store_flashcards(note.id, flashcards_data)
+            db.session.commit()
+            result = [serialize_flashcard(fc) for fc in generated]
+
+        with _jobs_lock:
+            _jobs[job_id].update(state="done", flashcards=result, finished_at=time.monotonic())
+    except Exception as e:
+        logger.exception("Flashcard generation job %s failed", job_id)
+        with _jobs_lock:
+            _jobs[job_id].update(state="failed", error=str(e), finished_at=time.monotonic())
+
+
+# ===== Route: Generate Flashcards =====
+@flashcard_bp.route("/flashcards/generate/<int:note_id>", methods=["POST"])
+def generate_flashcards(note_id):
+    """Generate multiple-choice flashcards from a note using OpenAI.
+
+    Cache hits persist and return 201 immediately; everything else is
+    queued to the background executor and answered with 202 plus a poll
+    URL, so no request thread sits pinned on model latency.
+    """
+    note = Note.query.get(note_id)
+    if not note:
+        return jsonify({"error": "Note not found"}), 404
+
+    # 1️ Ensure the note has text content
+    if not note.content:
+        return jsonify({"error": "Note has no text content"}), 400
+
+    text = note.content
+
+    # 2️ Exact-match response cache: identical note content regenerated
+    # within the TTL skips the OpenAI call entirely. updated_at in the
+    # key invalidates naturally when the note is edited.
+    cache_key = hashlib.sha256(
+        f"flashcards:{note.id}:{note.updated_at.isoformat() if note.updated_at else ''}:{text}".encode()
+    ).hexdigest()
+    flashcards_data = cache.get(cache_key)
+
+    if flashcards_data is not None:
+        # 3️ Fast path: no model call needed, answer synchronously
+        generated_flashcards = store_flashcards(note.id, flashcards_data)
+        db.session.commit()
+
+        resp = jsonify({
+            "success": True,
+            "message": f"{len(generated_flashcards)} flashcards generated successfully.",
+            "flashcards": [serialize_flashcard(fc) for fc in generated_flashcards],
+        })
+        resp.headers["X-Cache"] = "HIT"
+        return resp, 201
+
+    # 4️ Queue the generation and hand back a poll URL
+    job_id = uuid.uuid4().hex
+    with _jobs_lock:
+        _prune_jobs()
+        _jobs[job_id] = {"state": "queued", "note_id": note_id}
+    ai_executor.submit(
+        run_generation_job, current_app._get_current_object(),
+        job_id, note_id, cache_key,
+    )
+
+    resp = jsonify({
         "success": True,
-        "message": f"{len(generated_flashcards)} flashcards generated successfully.",
-        "flashcards": [serialize_flashcard(fc) for fc in generated_flashcards],
-    }), 201
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": url_for("flashcard_bp.get_flashcard_job", job_id=job_id, _external=True),
+    })
+    resp.headers["X-Cache"] = "MISS"
+    return resp, 202
+
+
+# ===== Route: Poll a Generation Job =====
+@flashcard_bp.route("/flashcards/jobs/<job_id>", methods=["GET"])
+def get_flashcard_job(job_id):
+    """Report the state (and results, once done) of a generation job."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        payload = dict(job) if job else None
+    if payload is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    status = {"queued": 202, "running": 202, "done": 200, "failed": 500}[payload["state"]]
+    return jsonify(payload), status
 
 
 # ===== Serializer =====
@@ -118,6 +299,7 @@ def serialize_flashcard(fc):
         "options": fc.options or [],
         "answer": fc.answer,
         "note_id": fc.note_id,
-        "created_at": fc.created_at.isoformat() if fc.created_at else None,
+        # raw datetime — the orjson provider emits RFC 3339 (or null)
+        "created_at": fc.created_at,
     }
 
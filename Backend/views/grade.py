@@ -1,15 +1,30 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from models import db, Grade, Submission, User, Assignment
-from datetime import datetime
+from cache import cache
+from tasks import ai_slots
+from sqlalchemy.orm import joinedload, load_only, raiseload
+from functools import lru_cache
 from openai import OpenAI
+import hashlib
 import os
 
 
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Hard timeout bounds how long a worker can stay pinned on one call
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=60.0)
 
 grade_bp = Blueprint("grade_bp", __name__)
 
+# Static grading instructions kept out of the per-request prompt so the
+# provider's prompt cache can reuse the token prefix across submissions
+GRADING_SYSTEM_PROMPT = """You are an academic instructor grading a student's work.
+Grade the submission fairly between 0 and 100 based on clarity, accuracy, completeness, and relevance.
+Respond in JSON with two fields:
+{
+    "suggested_score": <number between 0 and 100>,
+    "feedback": "<brief constructive feedback>"
+}"""
+
 # =========================
 # CREATE A GRADE (Instructor)
 # =========================
@@ -36,17 +51,20 @@ def create_grade():
         return jsonify({"error": "Instructor not found"}), 404
 
     # --- Prevent duplicate grading ---
-    existing_grade = Grade.query.filter_by(submission_id=submission_id).first()
+    # SELECT EXISTS(...) short-circuits on the first hit and hydrates
+    # nothing, unlike .first() which builds a full ORM row
+    existing_grade = db.session.query(
+        Grade.query.filter_by(submission_id=submission_id).exists()
+    ).scalar()
     if existing_grade:
         return jsonify({"error": "This submission has already been graded"}), 400
 
+    # timestamps come from the database (server_default/onupdate)
     new_grade = Grade(
         score=score,
         feedback=feedback,
         submission_id=submission.id,
-        instructor_id=instructor.id,
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow()
+        instructor_id=instructor.id
     )
     db.session.add(new_grade)
     db.session.commit()
@@ -78,7 +96,6 @@ def update_grade(grade_id):
     if feedback:
         grade.feedback = feedback
 
-    grade.updated_at = datetime.utcnow()
     db.session.commit()
 
     return jsonify({
@@ -104,7 +121,19 @@ def get_grade_for_submission(submission_id):
 # =========================
 @grade_bp.route("/grades/instructor/<int:instructor_id>", methods=["GET"])
 def get_grades_by_instructor(instructor_id):
-    grades = Grade.query.filter_by(instructor_id=instructor_id).all()
+    # serialize_grade touches submission and instructor on every row —
+    # eager-load both so the list is one JOINed query, not 2N+1.
+    # load_only keeps Submission.content and User.password/bio out of
+    # the joined rows.
+    query = Grade.query.options(
+        joinedload(Grade.submission).load_only(Submission.id, Submission.student_id),
+        joinedload(Grade.instructor).load_only(User.id, User.username),
+    )
+    if current_app.debug:
+        # Dev/test only: turn any lazy load the serializer sneaks in
+        # into an error rather than a silent per-row SELECT
+        query = query.options(raiseload("*"))
+    grades = query.filter_by(instructor_id=instructor_id).all()
     return jsonify([serialize_grade(g) for g in grades])
 
 
@@ -127,6 +156,17 @@ def delete_grade(grade_id):
 # =========================
 
 
+@lru_cache(maxsize=1024)
+def _grading_preamble(assignment_id, updated_at, title, description):
+    """Per-assignment prompt preamble, built once per assignment version.
+
+    Keyed on (id, updated_at) so an edited assignment gets a fresh
+    entry; reusing the exact same string keeps the prompt prefix
+    byte-stable, which provider-side prompt caching depends on.
+    """
+    return f"Here are the assignment details:\n{title} - {description or ''}"
+
+
 @grade_bp.route("/grades/ai_suggest/<int:submission_id>", methods=["POST"])
 def ai_suggest_grade(submission_id):
     """Generate AI-based grade suggestion (score + feedback)."""
@@ -136,38 +176,59 @@ def ai_suggest_grade(submission_id):
 
     # Fetch assignment details (if linked)
     assignment = Assignment.query.get(submission.assignment_id)
-    assignment_instructions = assignment.title + " - " + (assignment.description or "") if assignment else "No description provided."
+    if assignment:
+        preamble = _grading_preamble(
+            assignment.id, assignment.updated_at,
+            assignment.title, assignment.description,
+        )
+    else:
+        preamble = "Here are the assignment details:\nNo description provided."
 
     # Combine submission data
     content = submission.content or "No text content provided."
     file_path = submission.file_path or None
 
-    # --- Construct prompt for OpenAI ---
-    prompt = f"""
-    You are an academic instructor grading a student's work.
-    Here are the assignment details:
-    {assignment_instructions}
-
-    Student's submission:
-    {content}
-
-    Grade the submission fairly between 0 and 100 based on clarity, accuracy, completeness, and relevance.
-    Respond in JSON with two fields:
-    {{
-        "suggested_score": <number between 0 and 100>,
-        "feedback": "<brief constructive feedback>"
-    }}
-    """
+    # Response cache: re-suggesting a grade for an unchanged submission
+    # returns the stored suggestion without another OpenAI call
+    cache_key = hashlib.sha256(
+        f"ai_grade:{submission.id}:{submission.updated_at.isoformat() if submission.updated_at else ''}:{submission.assignment_id}".encode()
+    ).hexdigest()
+    cached = cache.get(cache_key)
+    if cached is not None:
+        resp = jsonify({
+            "success": True,
+            "ai_suggestion": cached,
+            "submission_id": submission_id
+        })
+        resp.headers["X-Cache"] = "HIT"
+        return resp
+
+    # --- Only the assignment details and submission vary per call ---
+    prompt = f"""{preamble}
+
+Student's submission:
+{content}"""
+
+    # Backpressure: shed with a retryable 503 once every AI slot is busy
+    if not ai_slots.acquire(blocking=False):
+        return jsonify({"error": "AI grading is busy, please retry shortly"}), 503
 
     try:
-        response = client.responses.create(
+        # stream=True consumes the output as it is generated rather than
+        # waiting for the full response object to be assembled
+        stream = client.responses.create(
             model="gpt-4.1-mini",
+            instructions=GRADING_SYSTEM_PROMPT,
             input=prompt,
-            temperature=0.3
+            temperature=0.3,
+            stream=True
         )
 
-        # Extract and parse JSON from OpenAI output
-        ai_output = response.output[0].content[0].text.strip()
+        parts = []
+        for event in stream:
+            if event.type == "response.output_text.delta":
+                parts.append(event.delta)
+        ai_output = "".join(parts).strip()
 
         # Try to parse JSON safely
         import json
@@ -180,14 +241,20 @@ def ai_suggest_grade(submission_id):
                 "feedback": ai_output
             }
 
-        return jsonify({
+        cache.set(cache_key, result, ttl=3600)
+
+        resp = jsonify({
             "success": True,
             "ai_suggestion": result,
             "submission_id": submission_id
         })
+        resp.headers["X-Cache"] = "MISS"
+        return resp
 
     except Exception as e:
         return jsonify({"error": f"AI grading failed: {str(e)}"}), 500
+    finally:
+        ai_slots.release()
 
 # =========================
 # SERIALIZER
@@ -203,8 +270,9 @@ def serialize_grade(grade):
         },
         "instructor": {
             "id": grade.instructor.id,
-            "name": getattr(grade.instructor, "name", "Unknown")
+            "name": grade.instructor.username
         },
-        "created_at": grade.created_at.isoformat() if grade.created_at else None,
-        "updated_at": grade.updated_at.isoformat() if grade.updated_at else None
+        # raw datetimes — the orjson provider emits RFC 3339 (or null)
+        "created_at": grade.created_at,
+        "updated_at": grade.updated_at
     }
@@ -1,7 +1,10 @@
-from flask import Blueprint, request, jsonify, send_from_directory, url_for
+from flask import Blueprint, request, jsonify, send_from_directory, url_for, current_app
 from werkzeug.utils import secure_filename
 from models import db, Note, Unit, User
-from datetime import datetime
+from tasks import executor, hash_stream, spool_upload, persist_upload
+from sqlalchemy.orm import joinedload, load_only, raiseload
+from sqlalchemy.exc import IntegrityError
+import hashlib
 import os
 
 note_bp = Blueprint("note_bp", __name__)
@@ -10,13 +13,15 @@ note_bp = Blueprint("note_bp", __name__)
 # File Upload Config
 # ---------------------------
 UPLOAD_FOLDER = "static/notes"
-ALLOWED_EXTENSIONS = {"pdf"}
+ALLOWED_EXTENSIONS = frozenset({"pdf"})
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 
 def allowed_file(filename):
     """Check if uploaded file has a valid extension."""
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+    # rpartition returns a 3-tuple without building a list like rsplit
+    _, dot, ext = filename.rpartition(".")
+    return bool(dot) and ext.lower() in ALLOWED_EXTENSIONS
 
 
 # ---------------------------
@@ -41,13 +46,20 @@ def create_note():
     if not uploader:
         return jsonify({"error": "Uploader (user) not found"}), 404
 
-    # Check for duplicate content or file in the same unit
+    # Check for duplicate content in the same unit by comparing hashes —
+    # a fixed-size indexed equality probe instead of full TEXT comparison
+    content_sha256 = None
     if content:
-        existing_content = Note.query.filter_by(unit_id=unit.id, content=content).first()
+        content_sha256 = hashlib.sha256(content.encode()).hexdigest()
+        existing_content = db.session.query(Note.id).filter_by(
+            unit_id=unit.id, content_sha256=content_sha256
+        ).first()
         if existing_content:
             return jsonify({"error": "A note with the same content already exists in this unit."}), 400
 
     file_path = None
+    file_sha256 = None
+    tmp = None
     if file:
         if not allowed_file(file.filename):
             return jsonify({"error": "Only PDF files are allowed"}), 400
@@ -55,25 +67,44 @@ def create_note():
         filename = secure_filename(file.filename)
         file_path = os.path.join(UPLOAD_FOLDER, filename)
 
-        # Check for duplicate filename in same unit
-        existing_file = Note.query.filter_by(unit_id=unit.id, file_path=file_path).first()
+        # Dedupe on content, not filename: the same PDF uploaded under a
+        # different name is still a duplicate, and the indexed hash
+        # lookup is an O(log N) probe
+        file_sha256 = hash_stream(file.stream)
+        existing_file = Note.query.filter_by(unit_id=unit.id, file_sha256=file_sha256).first()
         if existing_file:
             return jsonify({"error": "A note with the same PDF already exists in this unit."}), 400
 
-        # Save file
-        file.save(file_path)
+        # spool now, write to disk in the background after the commit
+        tmp = spool_upload(file)
 
     new_note = Note(
         content=content,
-        file_path=file_path,
+        content_sha256=content_sha256,
+        file_path=None,  # filled in by the background write
+        file_sha256=file_sha256,
         unit_id=unit.id,
-        uploaded_by=uploader.id,
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow()
+        uploaded_by=uploader.id
     )
 
     db.session.add(new_note)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # belt-and-braces: a concurrent request inserted the same
+        # content between the check above and this commit
+        db.session.rollback()
+        if tmp is not None:
+            tmp.close()
+        return jsonify({"error": "A note with the same content already exists in this unit."}), 400
+
+    # Disk write happens off the request thread; the worker fills in
+    # file_path once the bytes are safely down
+    if tmp is not None:
+        executor.submit(
+            persist_upload, current_app._get_current_object(),
+            tmp, file_path, Note, new_note.id,
+        )
 
     return jsonify({
         "success": True,
@@ -91,7 +122,24 @@ def get_all_notes():
     unit_id = request.args.get("unit_id")
     uploaded_by = request.args.get("uploaded_by")
 
-    query = Note.query
+    # serialize_note walks unit -> course and uploader; eager-load them
+    # here so the list emits one JOINed query instead of 3 lazy SELECTs
+    # per note. load_only trims the SELECT to the columns the serializer
+    # reads — the joined rows shed User.password/bio and Unit.overview.
+    query = Note.query.options(
+        load_only(
+            Note.id, Note.content, Note.file_path, Note.file_ready,
+            Note.is_active, Note.unit_id, Note.uploaded_by,
+            Note.created_at, Note.updated_at,
+        ),
+        joinedload(Note.unit).load_only(Unit.id, Unit.title).joinedload(Unit.course),
+        joinedload(Note.uploader).load_only(User.id),
+    )
+    if current_app.debug:
+        # Dev/test only: any relationship the serializer touches that
+        # isn't eager-loaded above raises instead of silently firing a
+        # lazy SELECT per row — catches N+1 regressions early
+        query = query.options(raiseload("*"))
     if unit_id:
         query = query.filter_by(unit_id=unit_id)
     if uploaded_by:
@@ -120,10 +168,14 @@ def get_note(note_id):
 # ---------------------------
 @note_bp.route("/notes/<int:note_id>/download", methods=["GET"])
 def download_note_pdf(note_id):
-    note = Note.query.get(note_id)
-    if not note or not note.file_path:
+    note = db.session.get(Note, note_id)
+    if not note or not note.file_path or not note.file_ready:
         return jsonify({"error": "No PDF available for this note"}), 404
 
+    # send_from_directory honors USE_X_SENDFILE (see create_app): with a
+    # proxy in front, Flask emits an X-Sendfile header and the proxy
+    # splices the file with sendfile(2) — the WSGI thread never reads
+    # the bytes. It also answers If-Modified-Since/If-Range itself.
     directory = os.path.dirname(note.file_path)
     filename = os.path.basename(note.file_path)
     return send_from_directory(directory, filename, as_attachment=True)
@@ -143,12 +195,25 @@ def update_note(note_id):
     uploaded_by = request.form.get("uploaded_by")
     file = request.files.get("pdf_file")
 
-    if content:
-        note.content = content
     if unit_id and Unit.query.get(unit_id):
         note.unit_id = unit_id
     if uploaded_by and User.query.get(uploaded_by):
         note.uploaded_by = uploaded_by
+    if content:
+        content_sha256 = hashlib.sha256(content.encode()).hexdigest()
+        # Same hash probe as create_note, excluding this note — editing
+        # a note into a duplicate of another in the unit is a 400, not
+        # a unique-constraint blow-up at commit
+        duplicate = db.session.query(Note.id).filter(
+            Note.unit_id == note.unit_id,
+            Note.content_sha256 == content_sha256,
+            Note.id != note.id,
+        ).first()
+        if duplicate:
+            db.session.rollback()
+            return jsonify({"error": "A note with the same content already exists in this unit."}), 400
+        note.content = content
+        note.content_sha256 = content_sha256
     if file:
         if not allowed_file(file.filename):
             return jsonify({"error": "Only PDF files are allowed"}), 400
@@ -156,9 +221,15 @@ def update_note(note_id):
         file_path = os.path.join(UPLOAD_FOLDER, filename)
         file.save(file_path)
         note.file_path = file_path
+        note.file_ready = True
 
-    note.updated_at = datetime.utcnow()
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Backstop for a concurrent edit landing the same content
+        # between the probe and the commit
+        db.session.rollback()
+        return jsonify({"error": "A note with the same content already exists in this unit."}), 400
 
     return jsonify({
         "success": True,
@@ -202,8 +273,10 @@ def delete_note(note_id):
 # ---------------------------
 def serialize_note(note):
     """Return a clean JSON structure for each note."""
+    # file_ready is maintained by the save path and the background
+    # upload worker — no lstat syscall per serialized row
     pdf_url = None
-    if note.file_path and os.path.exists(note.file_path):
+    if note.file_ready and note.file_path:
         pdf_url = url_for("note_bp.download_note_pdf", note_id=note.id, _external=True)
 
     return {
@@ -220,6 +293,7 @@ def serialize_note(note):
             }
         },
         "uploaded_by": note.uploader.id if note.uploader else None,
-        "created_at": note.created_at.isoformat() if note.created_at else None,
-        "updated_at": note.updated_at.isoformat() if note.updated_at else None
+        # raw datetimes — the orjson provider emits RFC 3339 (or null)
+        "created_at": note.created_at,
+        "updated_at": note.updated_at
     }
@@ -1,6 +1,5 @@
 from flask import Blueprint, request, jsonify
 from models import db, Question, User
-from datetime import datetime
 
 question_bp = Blueprint("question_bp", __name__)
 
@@ -27,12 +26,11 @@ def create_question():
     if existing:
         return jsonify({"error": "You already asked a question with this title."}), 400
 
+    # timestamps come from the database (server_default/onupdate)
     question = Question(
         title=title,
         body=body,
-        author_id=author_id,
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow()
+        author_id=author_id
     )
 
     db.session.add(question)
@@ -97,7 +95,6 @@ def update_question(question_id):
     if body:
         question.body = body
 
-    question.updated_at = datetime.utcnow()
     db.session.commit()
 
     return jsonify({
@@ -143,7 +140,8 @@ def serialize_question(q):
         "title": q.title,
         "body": q.body,
         "author_id": q.author_id,
-        "created_at": q.created_at.isoformat() if q.created_at else None,
-        "updated_at": q.updated_at.isoformat() if q.updated_at else None,
+        # raw datetimes — the orjson provider emits RFC 3339 (or null)
+        "created_at": q.created_at,
+        "updated_at": q.updated_at,
         "answers_count": len(q.answers)
     }
@@ -1,11 +1,16 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from models import db, Submission, Assignment, User
+from tasks import executor, hash_stream, spool_upload, persist_upload
+from sqlalchemy import func
 from datetime import datetime
 import os
 
 submission_bp = Blueprint("submission_bp", __name__)
 
 UPLOAD_DIR = "uploads/submissions"
+# hoisted to module scope — previously rebuilt as a set literal on
+# every upload
+ALLOWED_EXTENSIONS = frozenset({"pdf", "docx", "jpg", "jpeg", "png"})
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
@@ -38,8 +43,11 @@ def submit_assignment():
     if not student:
         return jsonify({"error": "Student not found"}), 404
 
-    #  Check number of attempts
-    attempts = Submission.query.filter_by(student_id=student_id, assignment_id=assignment_id).count()
+    #  Check number of attempts — COUNT over the index, no subquery
+    #  wrapping or row hydration
+    attempts = db.session.query(func.count(Submission.id)).filter_by(
+        student_id=student_id, assignment_id=assignment_id
+    ).scalar()
     if attempts >= 3:
         return jsonify({"error": "You have reached the maximum of 3 submission attempts"}), 400
 
@@ -49,30 +57,54 @@ def submit_assignment():
 
     #  Handle file upload
     file_path = None
+    file_sha256 = None
+    tmp = None
+    pending_path = None
     if file:
-        allowed_ext = {"pdf", "docx", "jpg", "jpeg", "png"}
-        ext = file.filename.split(".")[-1].lower()
-        if ext not in allowed_ext:
+        _, dot, ext = file.filename.rpartition(".")
+        ext = ext.lower()
+        if not dot or ext not in ALLOWED_EXTENSIONS:
             return jsonify({"error": f"Invalid file type: {ext}"}), 400
 
-        # Save file
-        filename = f"student{student_id}_assignment{assignment_id}_attempt{attempts + 1}_{file.filename}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        file.save(file_path)
+        # If this exact file was already submitted for the assignment,
+        # point at the existing copy instead of writing the bytes again.
+        # Only rows whose background write already landed qualify — a
+        # match still at file_path=NULL (write pending or failed) would
+        # hand this submission a permanent None.
+        file_sha256 = hash_stream(file.stream)
+        existing = Submission.query.filter(
+            Submission.assignment_id == assignment_id,
+            Submission.file_sha256 == file_sha256,
+            Submission.file_path.isnot(None),
+        ).first()
+        if existing:
+            file_path = existing.file_path
+        else:
+            filename = f"student{student_id}_assignment{assignment_id}_attempt{attempts + 1}_{file.filename}"
+            pending_path = os.path.join(UPLOAD_DIR, filename)
+            # spool now, write to disk in the background after the commit
+            tmp = spool_upload(file)
 
     #  Create submission
     submission = Submission(
         student_id=student_id,
         assignment_id=assignment_id,
         content=content,
-        file_path=file_path,
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow()
+        file_path=file_path,  # None until the background write lands
+        file_sha256=file_sha256
     )
 
     db.session.add(submission)
     db.session.commit()
 
+    # Disk write happens off the request thread; the worker fills in
+    # file_path once the bytes are safely down
+    if tmp is not None:
+        executor.submit(
+            persist_upload, current_app._get_current_object(),
+            tmp, pending_path, Submission, submission.id,
+        )
+
     return jsonify({
         "success": True,
         "message": f"Submission successful (Attempt {attempts + 1} of 3)",
@@ -121,6 +153,7 @@ def serialize_submission(submission):
         "assignment_id": submission.assignment_id,
         "content": submission.content,
         "file_path": submission.file_path,
-        "created_at": submission.created_at.isoformat() if submission.created_at else None,
-        "updated_at": submission.updated_at.isoformat() if submission.updated_at else None,
+        # raw datetimes — the orjson provider emits RFC 3339 (or null)
+        "created_at": submission.created_at,
+        "updated_at": submission.updated_at,
     }
@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
 from models import db, Unit, Course, User
+from sqlalchemy import delete, update
+from cache import cache
 
 unit_bp = Blueprint("unit_bp", __name__)
 
@@ -18,19 +20,17 @@ def create_unit():
     if not all([title, course_id, instructor_id]):
         return jsonify({"error": "Title, course_id, and instructor_id are required"}), 400
 
-    # Check if course exists
-    course = Course.query.get(course_id)
-    if not course:
+    # Check if course exists — id-only probe, no row hydration
+    if not db.session.query(Course.id).filter_by(id=course_id).scalar():
         return jsonify({"error": "Course not found"}), 404
 
     # Check if instructor exists
-    instructor = User.query.get(instructor_id)
-    if not instructor:
+    if not db.session.query(User.id).filter_by(id=instructor_id).scalar():
         return jsonify({"error": "Instructor not found"}), 404
 
-    # Prevent duplicate unit title within the same course
-    existing_unit = Unit.query.filter_by(title=title, course_id=course_id).first()
-    if existing_unit:
+    # Prevent duplicate unit title within the same course — index-only
+    # probe on (course_id, title), no row hydration
+    if db.session.query(Unit.id).filter_by(title=title, course_id=course_id).limit(1).scalar():
         return jsonify({"error": f"A unit titled '{title}' already exists in this course."}), 400
 
     # Create new unit
@@ -91,18 +91,26 @@ def get_units():
 # =========================
 @unit_bp.route("/units/<int:unit_id>", methods=["GET"])
 def get_unit(unit_id):
-    unit = Unit.query.get(unit_id)
-    if not unit:
-        return jsonify({"error": "Unit not found"}), 404
+    # Short-TTL cache: mutators below invalidate explicitly, the TTL
+    # just bounds staleness if an invalidation is ever missed
+    cache_key = f"unit:{unit_id}"
+    payload = cache.get(cache_key)
+    if payload is None:
+        unit = db.session.get(Unit, unit_id)
+        if not unit:
+            return jsonify({"error": "Unit not found"}), 404
+
+        payload = {
+            "id": unit.id,
+            "title": unit.title,
+            "overview": unit.overview,
+            "course_id": unit.course_id,
+            "instructor_id": unit.instructor_id,
+            "is_active": unit.is_active
+        }
+        cache.set(cache_key, payload, ttl=30)
 
-    return jsonify({
-        "id": unit.id,
-        "title": unit.title,
-        "overview": unit.overview,
-        "course_id": unit.course_id,
-        "instructor_id": unit.instructor_id,
-        "is_active": unit.is_active
-    })
+    return jsonify(payload)
 
 
 # =========================
@@ -110,7 +118,7 @@ def get_unit(unit_id):
 # =========================
 @unit_bp.route("/units/<int:unit_id>", methods=["PATCH"])
 def update_unit(unit_id):
-    unit = Unit.query.get(unit_id)
+    unit = db.session.get(Unit, unit_id)
     if not unit:
         return jsonify({"error": "Unit not found"}), 404
 
@@ -120,9 +128,14 @@ def update_unit(unit_id):
     new_instructor_id = data.get("instructor_id", unit.instructor_id)
     new_is_active = data.get("is_active", unit.is_active)
 
-    # Prevent duplicate titles on update
-    duplicate_unit = Unit.query.filter_by(title=new_title, course_id=unit.course_id).first()
-    if duplicate_unit and duplicate_unit.id != unit.id:
+    # Prevent duplicate titles on update — excludes this unit in SQL
+    # rather than fetching a row to compare ids in Python
+    clash = db.session.query(Unit.id).filter(
+        Unit.title == new_title,
+        Unit.course_id == unit.course_id,
+        Unit.id != unit.id,
+    ).limit(1).scalar()
+    if clash:
         return jsonify({"error": f"A unit titled '{new_title}' already exists in this course."}), 400
 
     unit.title = new_title
@@ -131,6 +144,7 @@ def update_unit(unit_id):
     unit.is_active = new_is_active
 
     db.session.commit()
+    cache.delete(f"unit:{unit_id}")
 
     return jsonify({
         "success": "Unit updated successfully",
@@ -150,14 +164,21 @@ def update_unit(unit_id):
 # =========================
 @unit_bp.route("/units/<int:unit_id>/toggle-active", methods=["PATCH"])
 def toggle_unit_status(unit_id):
-    unit = Unit.query.get(unit_id)
-    if not unit:
+    # One atomic UPDATE flips the flag and RETURNING reports the new
+    # value — no SELECT-then-UPDATE round trip, no race with a
+    # concurrent toggle. A missing id simply returns no row.
+    row = db.session.execute(
+        update(Unit)
+        .where(Unit.id == unit_id)
+        .values(is_active=~Unit.is_active)
+        .returning(Unit.is_active)
+    ).first()
+    if row is None:
         return jsonify({"error": "Unit not found"}), 404
 
-    unit.is_active = not unit.is_active
     db.session.commit()
-
-    status = "activated" if unit.is_active else "deactivated"
+    cache.delete(f"unit:{unit_id}")
+    status = "activated" if row.is_active else "deactivated"
     return jsonify({"success": f"Unit {status} successfully"})
 
 
@@ -166,11 +187,13 @@ def toggle_unit_status(unit_id):
 # =========================
 @unit_bp.route("/units/<int:unit_id>", methods=["DELETE"])
 def delete_unit(unit_id):
-    unit = Unit.query.get(unit_id)
-    if not unit:
+    # Single bulk DELETE; notes, assignments and their children go with
+    # it via ON DELETE CASCADE instead of ORM-loaded collections
+    result = db.session.execute(delete(Unit).where(Unit.id == unit_id))
+    if not result.rowcount:
         return jsonify({"error": "Unit not found"}), 404
 
-    db.session.delete(unit)
     db.session.commit()
+    cache.delete(f"unit:{unit_id}")
     return jsonify({"success": "Unit deleted successfully"})
 
@@ -1,30 +1,57 @@
 from flask import Blueprint, request, jsonify, current_app, url_for
 from models import db, User
+from sqlalchemy import case, delete, func, or_
+from cache import cache
+from tasks import hash_executor, remove_file_async
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 import os
-from datetime import datetime
-from mimetypes import guess_type
+import shutil
 
 user_bp = Blueprint("user_bp", __name__)
 
 # ===== File Upload Config =====
 UPLOAD_FOLDER = os.path.join("static", "uploads", "profiles")
-ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
 MAX_CONTENT_LENGTH = 2 * 1024 * 1024  # 2 MB
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Verified against when the email doesn't match any user, so a login
+# miss burns the same KDF cost as a hit and response timing doesn't
+# leak which emails are registered
+DUMMY_HASH = generate_password_hash("studybuddy-dummy-password", method="scrypt")
+
 
 # ===== Helper Functions =====
-def allowed_file(file):
-    """Ensure file is a valid image by checking extension and MIME type."""
-    filename = file.filename
-    if not ("." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS):
-        return False
+def _profile_picture_url(user):
+    """Public URL for a user's profile picture (None if unset).
+
+    Prefers STATIC_BASE_URL — a plain f-string concat — over
+    url_for(_external=True), which rebuilds the URL through Werkzeug's
+    map adapter and host-header parsing on every call.
+    """
+    if not user.profile_picture:
+        return None
+    base = current_app.config.get("STATIC_BASE_URL")
+    if base:
+        return f"{base.rstrip('/')}/{user.profile_picture}"
+    return url_for("static", filename=user.profile_picture, _external=True)
+
+
+# Magic numbers for the image formats we accept (PNG, JPEG, GIF)
+_IMAGE_SIGNATURES = (b"\x89PNG\r\n\x1a\n", b"\xff\xd8\xff", b"GIF87a", b"GIF89a")
+
 
-    mime_type, _ = guess_type(filename)
-    return mime_type and mime_type.startswith("image/")
+def is_image(stream):
+    """Check the upload is really an image by its magic bytes.
+
+    Extensions and guess_type only look at the filename, so a renamed
+    evil.php.jpg sailed through. Reading the first 12 bytes checks the
+    actual content and costs O(12) regardless of file size.
+    """
+    head = stream.read(12)
+    stream.seek(0)
+    return head.startswith(_IMAGE_SIGNATURES)
 
 
 # ===== Register User =====
@@ -40,20 +67,33 @@ def create_user():
     if not username or not email or not password:
         return jsonify({"error": "Username, email, and password are required"}), 400
 
-    if User.query.filter_by(username=username).first():
+    # Both uniqueness checks in one round trip: the OR filter hits the
+    # unique indexes and the aggregates say which column collided.
+    # (max(case) stands in for bool_or, which SQLite doesn't have.)
+    clash = db.session.query(
+        func.max(case((User.username == username, 1), else_=0)).label("u"),
+        func.max(case((User.email == email, 1), else_=0)).label("e"),
+    ).filter(or_(User.username == username, User.email == email)).one()
+
+    if clash.u:
         return jsonify({"error": "Username already exists"}), 400
 
-    if User.query.filter_by(email=email).first():
+    if clash.e:
         return jsonify({"error": "Email already exists"}), 400
 
-    hashed_pw = generate_password_hash(password)
-
     new_user = User(
         username=username,
         email=email,
-        password=hashed_pw,
         role=role
     )
+    # Hash on the dedicated KDF pool: hashlib's scrypt releases the GIL
+    # while the C code runs, so other requests keep moving, and the
+    # two-thread pool caps how many memory-hard hashes execute at once
+    # during a signup burst — without queueing behind uploads or AI
+    # jobs, which live on their own executors.
+    new_user.password = hash_executor.submit(
+        generate_password_hash, password, method="scrypt"
+    ).result()
 
     db.session.add(new_user)
     db.session.commit()
@@ -82,7 +122,10 @@ def login():
         return jsonify({"error": "Email and password are required"}), 400
 
     user = User.query.filter_by(email=email).first()
-    if not user or not check_password_hash(user.password, password):
+    if user is None:
+        check_password_hash(DUMMY_HASH, password)
+        return jsonify({"error": "Invalid email or password"}), 401
+    if not user.verify_password(password):
         return jsonify({"error": "Invalid email or password"}), 401
 
     return jsonify({
@@ -93,10 +136,7 @@ def login():
             "email": user.email,
             "role": user.role,
             "bio": user.bio,
-            "profile_picture": (
-                url_for("static", filename=user.profile_picture, _external=True)
-                if user.profile_picture else None
-            )
+            "profile_picture": _profile_picture_url(user)
         }
     }), 200
 
@@ -105,30 +145,35 @@ def login():
 @user_bp.route("/users/<int:user_id>", methods=["GET"])
 def get_user(user_id):
     """Retrieve a user's profile"""
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({"error": "User not found"}), 404
+    # 30s TTL bounds staleness; update_user/delete_user invalidate
+    # the key as soon as the profile changes
+    cache_key = f"user:{user_id}"
+    payload = cache.get(cache_key)
+    if payload is None:
+        user = db.session.get(User, user_id)
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+
+        payload = {
+            "id": user.id,
+            "username": user.username,
+            "email": user.email,
+            "role": user.role,
+            "bio": user.bio,
+            "profile_picture": _profile_picture_url(user),
+            "created_at": user.created_at.isoformat() if user.created_at else None,
+            "updated_at": user.updated_at.isoformat() if hasattr(user, "updated_at") and user.updated_at else None
+        }
+        cache.set(cache_key, payload, ttl=30)
 
-    return jsonify({
-        "id": user.id,
-        "username": user.username,
-        "email": user.email,
-        "role": user.role,
-        "bio": user.bio,
-        "profile_picture": (
-            url_for("static", filename=user.profile_picture, _external=True)
-            if user.profile_picture else None
-        ),
-        "created_at": user.created_at.isoformat() if user.created_at else None,
-        "updated_at": user.updated_at.isoformat() if hasattr(user, "updated_at") and user.updated_at else None
-    }), 200
+    return jsonify(payload), 200
 
 
 # ===== Update Profile =====
 @user_bp.route("/users/<int:user_id>", methods=["PATCH"])
 def update_user(user_id):
     """Update a user's profile"""
-    user = User.query.get(user_id)
+    user = db.session.get(User, user_id)
     if not user:
         return jsonify({"error": "User not found"}), 404
 
@@ -136,37 +181,48 @@ def update_user(user_id):
     file = request.files.get("profile_picture")
     remove_picture = data.get("remove_picture")
 
-    # Update text fields
+    # Update text fields — updated_at is stamped by the column's
+    # onupdate on flush, no Python-side utcnow() needed
     user.bio = data.get("bio", user.bio)
-    user.updated_at = datetime.utcnow()
 
     # Handle password change
     if data.get("password"):
-        user.password = generate_password_hash(data["password"])
+        user.set_password(data["password"])
 
-    # Handle removing picture
+    # Handle removing picture — unlink happens on the executor so the
+    # response isn't waiting on filesystem latency
     if remove_picture == "true":
         if user.profile_picture:
-            abs_path = os.path.join(current_app.root_path, "static", user.profile_picture)
-            if os.path.exists(abs_path):
-                os.remove(abs_path)
+            abs_path = os.path.join(current_app.config["STATIC_ROOT"], user.profile_picture)
+            remove_file_async(abs_path)
         user.profile_picture = None
 
     # Handle picture upload
     elif file:
-        if not allowed_file(file):
+        if not is_image(file.stream):
             return jsonify({"error": "Invalid file type. Only image files are allowed."}), 400
 
-        if len(file.read()) > MAX_CONTENT_LENGTH:
+        # Prefer the per-part header, but browsers rarely send it —
+        # fall back to seeking the already-buffered stream, which costs
+        # no reads. The global MAX_CONTENT_LENGTH bounds the body long
+        # before this.
+        size = file.content_length
+        if not size:
+            file.stream.seek(0, os.SEEK_END)
+            size = file.stream.tell()
+            file.stream.seek(0)
+        if size > MAX_CONTENT_LENGTH:
             return jsonify({"error": "File too large. Maximum size is 2MB."}), 400
 
-        file.seek(0)  # Reset file cursor after reading size check
         filename = secure_filename(f"{user.id}_{file.filename}")
         filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
+        # stream-copy in 64KB chunks instead of materializing the bytes
+        with open(filepath, "wb") as out:
+            shutil.copyfileobj(file.stream, out, length=64 * 1024)
         user.profile_picture = os.path.join("uploads", "profiles", filename)
 
     db.session.commit()
+    cache.delete(f"user:{user_id}")
 
     return jsonify({
         "success": "Profile updated successfully",
@@ -176,10 +232,7 @@ def update_user(user_id):
             "email": user.email,
             "bio": user.bio,
             "role": user.role,
-            "profile_picture": (
-                url_for("static", filename=user.profile_picture, _external=True)
-                if user.profile_picture else None
-            ),
+            "profile_picture": _profile_picture_url(user),
             "updated_at": user.updated_at.isoformat()
         }
     }), 200
@@ -189,17 +242,21 @@ def update_user(user_id):
 @user_bp.route("/users/<int:user_id>", methods=["DELETE"])
 def delete_user(user_id):
     """Delete a user account"""
-    user = User.query.get(user_id)
-    if not user:
+    # Only the picture path is needed before the delete — one scalar
+    # instead of hydrating the user row
+    row = db.session.query(User.profile_picture).filter_by(id=user_id).first()
+    if row is None:
         return jsonify({"error": "User not found"}), 404
 
-    # Delete profile picture file if it exists
-    if user.profile_picture:
-        abs_path = os.path.join(current_app.root_path, "static", user.profile_picture)
-        if os.path.exists(abs_path):
-            os.remove(abs_path)
+    # Delete profile picture file if it exists — off the request thread
+    if row.profile_picture:
+        abs_path = os.path.join(current_app.config["STATIC_ROOT"], row.profile_picture)
+        remove_file_async(abs_path)
 
-    db.session.delete(user)
+    # One bulk DELETE; votes, answers, submissions etc. cascade in the
+    # database (ON DELETE CASCADE) rather than through ORM collections
+    db.session.execute(delete(User).where(User.id == user_id))
     db.session.commit()
+    cache.delete(f"user:{user_id}")
 
     return jsonify({"success": "User deleted successfully"}), 200
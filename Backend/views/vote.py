@@ -1,11 +1,28 @@
 from flask import Blueprint, request, jsonify
 from models import db, Vote, Answer, User
+from sqlalchemy import func, case, desc, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from cache import cache
 
 vote_bp = Blueprint("vote_bp", __name__)
 
+
+def _invalidate_vote_caches(answer_id, question_id):
+    """Drop cached tallies touched by a vote change."""
+    cache.delete(f"votes:{answer_id}")
+    cache.delete(f"top_answers:{question_id}")
+    cache.delete("top_answers:None")  # the unfiltered listing
+
 # ==========================================================
 # 1️ CREATE OR TOGGLE A VOTE
 # ==========================================================
+# Both write branches below are single Core statements (DELETE or
+# upsert), so a vote costs one round trip plus the commit. The commit
+# itself is cheap under the connection pragmas set in app.py: WAL plus
+# synchronous=NORMAL appends to the log without a per-commit fsync,
+# which is SQLite's equivalent of relaxed synchronous commit, so a
+# vote storm on a hot answer serializes only on the in-memory WAL
+# append rather than on disk flushes.
 @vote_bp.route("/votes/<int:answer_id>", methods=["POST"])
 def vote_answer(answer_id):
     data = request.get_json()
@@ -17,32 +34,42 @@ def vote_answer(answer_id):
     if vote_type not in ["up", "down"]:
         return jsonify({"error": "vote_type must be 'up' or 'down'"}), 400
 
-    answer = Answer.query.get(answer_id)
-    if not answer:
+    # Existence probe that also yields the question_id the cached
+    # top-answers listing is keyed by
+    question_id = db.session.query(Answer.question_id).filter_by(id=answer_id).scalar()
+    if question_id is None:
         return jsonify({"error": "Answer not found"}), 404
 
-    user = User.query.get(user_id)
-    if not user:
+    if not db.session.query(User.id).filter_by(id=user_id).scalar():
         return jsonify({"error": "User not found"}), 404
 
-    # Check if vote exists
-    existing_vote = Vote.query.filter_by(user_id=user_id, answer_id=answer_id).first()
-
-    if existing_vote:
-        # Toggle or switch
-        if existing_vote.vote_type == vote_type:
-            db.session.delete(existing_vote)
-            db.session.commit()
-            return jsonify({"message": f"{vote_type}vote removed."}), 200
-        else:
-            existing_vote.vote_type = vote_type
-            db.session.commit()
-            return jsonify({"message": f"Vote changed to {vote_type}vote."}), 200
-    else:
-        new_vote = Vote(user_id=user_id, answer_id=answer_id, vote_type=vote_type)
-        db.session.add(new_vote)
+    # Toggle-off: one DELETE matching the same vote type; rowcount tells
+    # us whether anything was removed — no SELECT-then-DELETE race
+    result = db.session.execute(
+        delete(Vote).where(
+            Vote.user_id == user_id,
+            Vote.answer_id == answer_id,
+            Vote.vote_type == vote_type,
+        )
+    )
+    if result.rowcount:
         db.session.commit()
-        return jsonify({"message": f"{vote_type}vote added successfully."}), 201
+        _invalidate_vote_caches(answer_id, question_id)
+        return jsonify({"message": f"{vote_type}vote removed."}), 200
+
+    # Create or switch in a single upsert against the (user_id,
+    # answer_id) unique constraint — atomic under concurrent votes
+    db.session.execute(
+        sqlite_insert(Vote)
+        .values(user_id=user_id, answer_id=answer_id, vote_type=vote_type)
+        .on_conflict_do_update(
+            index_elements=["user_id", "answer_id"],
+            set_={"vote_type": vote_type},
+        )
+    )
+    db.session.commit()
+    _invalidate_vote_caches(answer_id, question_id)
+    return jsonify({"message": f"{vote_type}vote recorded."}), 200
 
 
 # ==========================================================
@@ -50,19 +77,29 @@ def vote_answer(answer_id):
 # ==========================================================
 @vote_bp.route("/votes/<int:answer_id>", methods=["GET"])
 def get_votes(answer_id):
-    answer = Answer.query.get(answer_id)
-    if not answer:
-        return jsonify({"error": "Answer not found"}), 404
-
-    upvotes = Vote.query.filter_by(answer_id=answer_id, vote_type="up").count()
-    downvotes = Vote.query.filter_by(answer_id=answer_id, vote_type="down").count()
+    # Cached for up to 30s; vote mutations invalidate the key directly
+    cache_key = f"votes:{answer_id}"
+    payload = cache.get(cache_key)
+    if payload is None:
+        if not db.session.query(Answer.id).filter_by(id=answer_id).scalar():
+            return jsonify({"error": "Answer not found"}), 404
+
+        # Both tallies in one pass over the answer's votes instead of two
+        # separate COUNT queries
+        upvotes, downvotes = db.session.query(
+            func.count(case((Vote.vote_type == "up", 1))),
+            func.count(case((Vote.vote_type == "down", 1))),
+        ).filter(Vote.answer_id == answer_id).one()
+
+        payload = {
+            "answer_id": answer_id,
+            "upvotes": upvotes,
+            "downvotes": downvotes,
+            "total_score": upvotes - downvotes
+        }
+        cache.set(cache_key, payload, ttl=30)
 
-    return jsonify({
-        "answer_id": answer_id,
-        "upvotes": upvotes,
-        "downvotes": downvotes,
-        "total_score": upvotes - downvotes
-    }), 200
+    return jsonify(payload), 200
 
 
 # ==========================================================
@@ -76,12 +113,15 @@ def remove_vote(answer_id):
     if not user_id:
         return jsonify({"error": "user_id is required"}), 400
 
-    vote = Vote.query.filter_by(answer_id=answer_id, user_id=user_id).first()
-    if not vote:
+    result = db.session.execute(
+        delete(Vote).where(Vote.answer_id == answer_id, Vote.user_id == user_id)
+    )
+    if not result.rowcount:
         return jsonify({"error": "No vote found for this user"}), 404
 
-    db.session.delete(vote)
     db.session.commit()
+    question_id = db.session.query(Answer.question_id).filter_by(id=answer_id).scalar()
+    _invalidate_vote_caches(answer_id, question_id)
     return jsonify({"message": "Vote removed successfully"}), 200
 
 
@@ -96,33 +136,52 @@ def get_top_answers():
     """
     question_id = request.args.get("question_id", type=int)
 
-    query = Answer.query
+    # The whole aggregated listing is cacheable; 30s TTL plus explicit
+    # invalidation from the vote mutators keeps it near-fresh
+    cache_key = f"top_answers:{question_id}"
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return jsonify(cached), 200
+
+    # One aggregated GROUP BY replaces two COUNT queries per answer
+    # (2N+1 round trips) and the Python-side sort
+    up = func.sum(case((Vote.vote_type == "up", 1), else_=0))
+    down = func.sum(case((Vote.vote_type == "down", 1), else_=0))
+
+    query = (
+        db.session.query(
+            Answer.id,
+            Answer.question_id,
+            Answer.author_id,
+            Answer.body,
+            up.label("upvotes"),
+            down.label("downvotes"),
+            (up - down).label("score"),
+        )
+        .outerjoin(Vote, Vote.answer_id == Answer.id)
+        .group_by(Answer.id)
+        .order_by(desc("score"))
+    )
     if question_id:
-        query = query.filter_by(question_id=question_id)
-
-    answers = query.all()
-
-    data = []
-    for a in answers:
-        upvotes = Vote.query.filter_by(answer_id=a.id, vote_type="up").count()
-        downvotes = Vote.query.filter_by(answer_id=a.id, vote_type="down").count()
-        score = upvotes - downvotes
-
-        data.append({
-            "answer_id": a.id,
-            "question_id": a.question_id,
-            "author_id": a.author_id,
-            "body": a.body,
-            "upvotes": upvotes,
-            "downvotes": downvotes,
-            "score": score
-        })
-
-    # Sort answers by highest score first
-    data = sorted(data, key=lambda x: x["score"], reverse=True)
-
-    return jsonify({
+        query = query.filter(Answer.question_id == question_id)
+
+    data = [
+        {
+            "answer_id": row.id,
+            "question_id": row.question_id,
+            "author_id": row.author_id,
+            "body": row.body,
+            "upvotes": row.upvotes or 0,
+            "downvotes": row.downvotes or 0,
+            "score": row.score or 0,
+        }
+        for row in query.all()
+    ]
+
+    payload = {
         "success": True,
         "total_answers": len(data),
         "answers": data
-    }), 200
+    }
+    cache.set(cache_key, payload, ttl=30)
+    return jsonify(payload), 200